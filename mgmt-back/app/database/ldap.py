@@ -1,11 +1,24 @@
 import ldap3
 from ldap3.core.exceptions import LDAPBindError, LDAPException
-from .models import LDAPUser
+from ldap3.core.results import RESULT_INVALID_CREDENTIALS
+from ldap3.utils.conv import escape_filter_chars
+from app.lib.utils.metrics import metrics
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+import asyncio
+import functools
+import logging
 import os
+import queue
+import threading
+import time
 
 load_dotenv()
 
+T = TypeVar("T")
+
 # This is a placeholder for a real configuration.
 # In a real application, these values should be stored in a configuration file.
 LDAP_SERVER = os.getenv('LDAP_SERVER', 'ldap://localhost')
@@ -13,55 +26,190 @@ LDAP_PORT = int(os.getenv('LDAP_PORT', 389))
 LDAP_ADMIN_USER = os.getenv('LDAP_ADMIN_USER', 'cn=admin,dc=example,dc=org')
 LDAP_ADMIN_PASSWORD = os.getenv('LDAP_ADMIN_PASSWORD', 'admin_password')
 LDAP_SEARCH_BASE = os.getenv('LDAP_SEARCH_BASE', 'ou=users,dc=example,dc=org')
+LDAP_POOL_SIZE = int(os.getenv('LDAP_POOL_SIZE', 4))
+LDAP_POOL_TIMEOUT = float(os.getenv('LDAP_POOL_TIMEOUT', 5))
+LDAP_CONNECT_TIMEOUT = float(os.getenv('LDAP_CONNECT_TIMEOUT', 5))
+LDAP_RECEIVE_TIMEOUT = float(os.getenv('LDAP_RECEIVE_TIMEOUT', 10))
+# What the first connection reads about the server. Only searches by known
+# attribute names are made, so the schema (the bulk of ALL) isn't needed.
+LDAP_GET_INFO = os.getenv('LDAP_GET_INFO', 'none')
+LDAP_INFO_MODES = {"none": ldap3.NONE, "dsa": ldap3.DSA, "schema": ldap3.SCHEMA, "all": ldap3.ALL}
+
+
+class LDAPUnavailableError(Exception):
+    """The directory can't answer right now, as opposed to rejecting the request."""
+    pass
+
+
+class LDAPPoolTimeout(LDAPUnavailableError):
+    pass
+
+
+class LDAPConnectionPool:
+    """Thread-safe pool of at most `size` LDAP connections, opened on demand.
+
+    A connection is only ever used by the thread that checked it out. Ones
+    that fail with an LDAP error are dropped rather than returned, together
+    with the idle ones, which whatever broke it has most likely broken too.
+    """
+
+    def __init__(self, factory: Callable[[], ldap3.Connection], size: int, timeout: float):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.idle: queue.LifoQueue[ldap3.Connection] = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.waits = 0
+        self.wait_ms = 0.0
+
+    @contextmanager
+    def connection(self) -> Iterator[ldap3.Connection]:
+        start = time.perf_counter()
+        if not self.slots.acquire(blocking=False):
+            self.waits += 1
+            if not self.slots.acquire(timeout=self.timeout):
+                raise LDAPPoolTimeout(f"No LDAP connection available after {self.timeout}s")
+            self.wait_ms += (time.perf_counter() - start) * 1000
+        conn: Optional[ldap3.Connection] = None
+        try:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+            yield conn
+        except LDAPException:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            self.close()
+            raise
+        finally:
+            if conn is not None:
+                self.idle.put(conn)
+            self.slots.release()
+
+    def _discard(self, conn: ldap3.Connection):
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self.idle.qsize(),
+            "waits": self.waits,
+            "wait_ms": round(self.wait_ms, 1),
+        }
+
 
 class LDAPDatabase:
-    def __init__(self):
-        self.server = ldap3.Server(LDAP_SERVER, port=LDAP_PORT, get_info=ldap3.ALL)
+    """LDAP directory access safe to share across concurrent requests.
+
+    Searches run on a pool of connections bound as the admin user; password
+    checks rebind connections from a second pool as the user instead of
+    opening a new TCP connection per login. ldap3 is blocking, so callers on
+    the event loop go through run(), which uses an executor sized to the pools.
+    """
+
+    def __init__(self, pool_size: int = LDAP_POOL_SIZE, pool_timeout: float = LDAP_POOL_TIMEOUT):
+        if LDAP_GET_INFO not in LDAP_INFO_MODES:
+            raise ValueError(f"Unknown LDAP_GET_INFO: {LDAP_GET_INFO}")
+        # Nothing connects here; pooled connections are opened on first use
+        self.server = ldap3.Server(
+            LDAP_SERVER,
+            port=LDAP_PORT,
+            get_info=LDAP_INFO_MODES[LDAP_GET_INFO],
+            connect_timeout=LDAP_CONNECT_TIMEOUT,
+        )
+        self.search_pool = LDAPConnectionPool(self._search_connection, pool_size, pool_timeout)
+        self.bind_pool = LDAPConnectionPool(self._bind_connection, pool_size, pool_timeout)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix="ldap")
+
+    def _search_connection(self) -> ldap3.Connection:
+        return ldap3.Connection(
+            self.server,
+            user=LDAP_ADMIN_USER,
+            password=LDAP_ADMIN_PASSWORD,
+            auto_bind=True,
+            read_only=True,
+            receive_timeout=LDAP_RECEIVE_TIMEOUT,
+        )
+
+    def _bind_connection(self) -> ldap3.Connection:
+        conn = ldap3.Connection(self.server, read_only=True, receive_timeout=LDAP_RECEIVE_TIMEOUT)
+        conn.open(read_server_info=False)
+        return conn
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run a blocking directory call on the LDAP executor."""
+        loop = asyncio.get_running_loop()
+        with metrics.time_stage("ldap", op=getattr(fn, "__name__", "call")):
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    def _call(self, pool: LDAPConnectionPool, fn: Callable[[ldap3.Connection], T]) -> T:
+        """Run `fn` on a pooled connection, once more on a new one if the first fails."""
         try:
-            self.connection = ldap3.Connection(self.server, user=LDAP_ADMIN_USER, password=LDAP_ADMIN_PASSWORD, auto_bind=True)
-        except LDAPBindError as e:
-            # Handle connection errors
-            print(f"Failed to bind to LDAP server: {e}")
-            self.connection = None
-
-    def authenticate(self, email: str, password: str) -> LDAPUser | None:
-        """Authenticate a user by email and password using LDAP bind."""
-        if not self.connection:
-            return None
-
-        search_filter = f'(mail={email})'
-        
+            with pool.connection() as conn:
+                return fn(conn)
+        except LDAPException as e:
+            logging.info(f"Retrying LDAP operation on a new connection: {e}")
         try:
-            # First, search for the user to get their DN
-            self.connection.search(
+            with pool.connection() as conn:
+                return fn(conn)
+        except LDAPException as e:
+            raise LDAPUnavailableError(f"LDAP server unavailable: {e}") from e
+
+    def warm_up(self):
+        """Open and bind one search connection, so the first login doesn't pay for it."""
+        with self.search_pool.connection():
+            pass
+
+    def find_user(self, email: str) -> Optional[tuple[str, str]]:
+        """Look up a user's DN and role by email."""
+        def search(conn: ldap3.Connection) -> Optional[tuple[str, str]]:
+            conn.search(
                 search_base=LDAP_SEARCH_BASE,
-                search_filter=search_filter,
+                search_filter=f'(mail={escape_filter_chars(email)})',
                 attributes=['mail', 'employeeType']  # Don't retrieve password for security
             )
-
-            if len(self.connection.entries) == 0:
+            if len(conn.entries) == 0:
                 return None
+            return conn.entries[0].entry_dn, conn.entries[0].employeeType.value
 
-            user_dn = self.connection.entries[0].entry_dn
-            role = self.connection.entries[0].employeeType.value
-
-            # Now, try to bind with the user's DN and provided password
-            user_connection = ldap3.Connection(self.server, user=user_dn, password=password, auto_bind=True)
-            user_connection.unbind()  # Close the connection after successful bind
+        return self._call(self.search_pool, search)
 
-            # If bind succeeded, return the user (without password)
-            return LDAPUser(email=email, password="", role=role)
+    def verify_password(self, user_dn: str, password: str) -> bool:
+        """Check a password by binding as the user on a pooled connection.
 
-        except LDAPBindError:
-            # Authentication failed
-            return None
-        except LDAPException as e:
-            print(f"An LDAP error occurred during authentication: {e}")
-            return None
+        Only a rejected password gives False; a bind that fails for any other
+        reason raises LDAPUnavailableError.
+        """
+        if not password:
+            # An empty password would be an unauthenticated bind, which succeeds
+            return False
 
-    def __del__(self):
-        if self.connection:
-            self.connection.unbind()
+        def bind(conn: ldap3.Connection) -> bool:
+            if conn.rebind(user=user_dn, password=password, read_server_info=False):
+                return True
+            if conn.result and conn.result.get("result") == RESULT_INVALID_CREDENTIALS:
+                return False
+            # Raised inside the pool's block so the connection is dropped
+            raise LDAPBindError(conn.last_error or "bind failed")
 
+        return self._call(self.bind_pool, bind)
 
+    def stats(self) -> dict:
+        return {"search_pool": self.search_pool.stats(), "bind_pool": self.bind_pool.stats()}
 
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.search_pool.close()
+        self.bind_pool.close()
@@ -1,22 +1,197 @@
 import pymongo
+import pymongo.monitoring
 import bson
 from .models import Dish, Order, OrderStatus, OrderType
-from typing import Optional, Any
-from datetime import datetime
+from app.lib.utils.dates import to_naive_utc
+from app.lib.utils.metrics import metrics
+from typing import Optional, Any, AsyncIterator, Callable, Iterable, Literal, TypeVar
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import heapq
+import itertools
 import logging
+import time
+import uuid
+
+T = TypeVar("T")
+
+BulkUpdateOutcome = Literal["updated", "not_found", "conflict"]
+
+
+ORDER_INDEXES = [
+    # Dashboard filters: status alone, status + type, plus a created_at range
+    pymongo.IndexModel(
+        [("status", pymongo.ASCENDING), ("type", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)],
+        name="status_type_created_at",
+    ),
+    pymongo.IndexModel([("type", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)], name="type_created_at"),
+    # Unfiltered date ranges and the keyset pagination sort
+    pymongo.IndexModel([("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)], name="created_at_id"),
+    # Pending outbox events; partial so delivered orders don't take up index space
+    pymongo.IndexModel(
+        [("_outbox.owner", pymongo.ASCENDING)],
+        name="outbox_owner",
+        partialFilterExpression={"_outbox.owner": {"$exists": True}},
+    ),
+    pymongo.IndexModel(
+        [("_outbox.at", pymongo.ASCENDING)],
+        name="outbox_at",
+        partialFilterExpression={"_outbox.at": {"$exists": True}},
+    ),
+    # The archiver's scan for long-delivered orders
+    pymongo.IndexModel([("status", pymongo.ASCENDING), ("updated_at", pymongo.ASCENDING)], name="status_updated_at"),
+]
+
+# Order documents carry their unpublished events in this field, see DBClient
+OUTBOX_FIELD = "_outbox"
+
+# Delivered orders are moved here once they are old enough, see DBClient.archive_orders
+ARCHIVE_COLLECTION = "orders_archive"
+ARCHIVED_AT_FIELD = "archived_at"
+
+# Archived orders are only read by date-range queries and never updated, so
+# the dashboard filter indexes are all they need
+ARCHIVE_INDEXES = [
+    pymongo.IndexModel(
+        [("status", pymongo.ASCENDING), ("type", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)],
+        name="status_type_created_at",
+    ),
+    pymongo.IndexModel([("type", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)], name="type_created_at"),
+    pymongo.IndexModel([("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)], name="created_at_id"),
+]
+
+
+class PoolWaitListener(pymongo.monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check a connection out of the pool."""
+
+    def connection_checked_out(self, event):
+        if event.duration is not None:
+            metrics.observe_stage("mongo_pool_wait", event.duration)
+
+    def connection_check_out_failed(self, event):
+        metrics.inc("mongo_pool_checkout_failures", reason=str(event.reason))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+class OrderStatusConflictError(Exception):
+    def __init__(self, order_id: str, expected_status: OrderStatus, current_status: OrderStatus):
+        self.order_id = order_id
+        self.expected_status = expected_status
+        self.current_status = current_status
+        super().__init__(f"Order {order_id} is {current_status}, expected {expected_status}")
+
+
+class DuplicateOrderUpdateError(ValueError):
+    def __init__(self, order_ids: list[str]):
+        self.order_ids = order_ids
+        super().__init__(f"Orders updated more than once: {', '.join(order_ids)}")
 
 
 class DBClient:
-    def __init__(self, uri: str, db_name: str):
-        self.client = pymongo.MongoClient(uri)
+    """Blocking Mongo access.
+
+    Order writes also record the event to publish in an `_outbox` array on
+    the order document itself, in the same single-document update, so the
+    change and its event are committed together without needing a replica
+    set for transactions. OutboxRelay publishes and removes them. Events are
+    tagged with this client's `instance_id` so each instance relays its own
+    and only picks up others' once they are overdue.
+
+    With `archive_after`, orders delivered longer ago than that are moved
+    from `orders` to `orders_archive` by archive_orders(), and order reads
+    cover both collections. `archive_retention` additionally lets Mongo
+    expire archived orders that long after they were archived.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        db_name: str,
+        max_pool_size: int = 100,
+        min_pool_size: int = 0,
+        slow_query_ms: Optional[float] = None,
+        client: Optional[pymongo.MongoClient] = None,
+        archive_after: Optional[timedelta] = None,
+        archive_retention: Optional[timedelta] = None,
+    ):
+        # `client` replaces the pymongo client, e.g. with an in-memory stand-in
+        self.client = client or pymongo.MongoClient(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            event_listeners=[PoolWaitListener()],
+        )
         self.db = self.client[db_name]
+        # When set, order queries slower than this log their explain() winning plan
+        self.slow_query_ms = slow_query_ms
+        self.instance_id = uuid.uuid4().hex
+        self.archive_after = archive_after
+        self.archive_retention = archive_retention
 
     def get_collection(self, collection_name: str):
         return self.db[collection_name]
 
+    def ensure_indexes(self):
+        """Create the indexes the order queries rely on. Safe to call on every startup."""
+        created = self.get_collection("orders").create_indexes(ORDER_INDEXES)
+        logging.info(f"Ensured orders indexes: {created}")
+        if not self.archive_after:
+            return
+        archive = self.get_collection(ARCHIVE_COLLECTION)
+        created = archive.create_indexes(ARCHIVE_INDEXES)
+        if self.archive_retention:
+            expire_after = int(self.archive_retention.total_seconds())
+            try:
+                created += archive.create_indexes([pymongo.IndexModel(
+                    [(ARCHIVED_AT_FIELD, pymongo.ASCENDING)], name="archived_at_ttl", expireAfterSeconds=expire_after,
+                )])
+            except pymongo.errors.OperationFailure:
+                # The TTL index exists with another retention, change it in place
+                self.db.command("collMod", ARCHIVE_COLLECTION, index={"name": "archived_at_ttl", "expireAfterSeconds": expire_after})
+        logging.info(f"Ensured {ARCHIVE_COLLECTION} indexes: {created}")
+
+    def _log_slow_query(self, cursor, query: dict, elapsed_ms: float):
+        try:
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan")
+        except Exception as e:
+            plan = f"explain failed: {e}"
+        logging.warning(f"Slow orders query ({elapsed_ms:.1f} ms) {query}, winning plan: {plan}")
+
+    def _outbox_event(self, channel: str, at: datetime) -> dict:
+        return {"event_id": bson.ObjectId(), "channel": channel, "owner": self.instance_id, "at": at}
+
     def create_order(self, order: Order):
         orders_collection = self.get_collection("orders")
-        result = orders_collection.insert_one(order.model_dump(by_alias=True, exclude={'id'}))
+        doc = order.model_dump(by_alias=True, exclude={'id'})
+        doc[OUTBOX_FIELD] = [self._outbox_event("orders:new", datetime.now())]
+        result = orders_collection.insert_one(doc)
         return str(result.inserted_id)
 
     def get_orders(
@@ -25,19 +200,100 @@ class DBClient:
         type: Optional[OrderType] = None,
         from_date: Optional[datetime] = None,
         to_date: Optional[datetime] = None,
+        after: Optional[tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+        fields: Optional[list[str]] = None,
     ):
-        orders_collection = self.get_collection("orders")
+        """Yield order documents matching the filters.
+
+        `after` is a (created_at, _id) keyset cursor: when it or `limit` is
+        given, results are sorted on that pair and resume strictly after it.
+        `fields` restricts the returned fields (_id is always included).
+
+        Queries that can match archived orders also read `orders_archive`;
+        both collections are then read in (created_at, _id) order and merged.
+        """
         query: dict[str, Any] = {"status": status} if status else {}
+        created_at: dict[str, datetime] = {}
         if from_date:
-            query["created_at"] = {"$gte": from_date}
+            created_at["$gte"] = from_date
         if to_date:
-            query["created_at"] = {"$lte": to_date}
+            created_at["$lte"] = to_date
+        if created_at:
+            query["created_at"] = created_at
             
         if type:
             query["type"] = type
-        cursor = orders_collection.find(query)
-        
-        for doc in cursor:
+        if after:
+            after_date, after_id = after
+            query = {"$and": [query, {"$or": [
+                {"created_at": {"$gt": after_date}},
+                {"created_at": after_date, "_id": {"$gt": bson.ObjectId(after_id)}},
+            ]}]}
+
+        if not self._reads_archive(status, from_date):
+            yield from self._find_orders("orders", query, fields, sort=bool(after or limit), limit=limit)
+            return
+
+        tiers = [
+            self._find_orders(collection, query, fields, sort=True, limit=limit)
+            for collection in ("orders", ARCHIVE_COLLECTION)
+        ]
+        try:
+            last_id = None
+            count = 0
+            for doc in heapq.merge(*tiers, key=lambda doc: (doc["created_at"], doc["_id"])):
+                # An order caught mid-move is in both collections, with the same content
+                if doc["_id"] == last_id:
+                    continue
+                last_id = doc["_id"]
+                yield doc
+                count += 1
+                if limit and count >= limit:
+                    return
+        finally:
+            for tier in tiers:
+                tier.close()
+
+    def _reads_archive(self, status: Optional[OrderStatus], from_date: Optional[datetime]) -> bool:
+        """Whether a query with these filters can match archived orders.
+
+        Only delivered orders are archived, and only once delivered for
+        `archive_after`, so every archived order was created before
+        now - archive_after.
+        """
+        if not self.archive_after or status not in (None, "delivered"):
+            return False
+        # Terminals send offsets ("...Z"); pymongo copes with those, the comparison wouldn't
+        return from_date is None or to_naive_utc(from_date) < datetime.now() - self.archive_after
+
+    def _find_orders(
+        self,
+        collection_name: str,
+        query: dict,
+        fields: Optional[list[str]],
+        sort: bool,
+        limit: Optional[int],
+    ):
+        if fields:
+            projection = {field: 1 for field in fields}
+        else:
+            projection = {OUTBOX_FIELD: 0} if collection_name == "orders" else {ARCHIVED_AT_FIELD: 0}
+        cursor = self.get_collection(collection_name).find(query, projection)
+        if sort:
+            # str(ObjectId) sorts like the ObjectId, so merged tiers stay in cursor order
+            cursor = cursor.sort([("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+        if limit:
+            cursor = cursor.limit(limit)
+
+        # Only time spent fetching from Mongo counts, not the consumer's work between yields
+        fetch_time = 0.0
+        while True:
+            start = time.perf_counter()
+            doc = next(cursor, None)
+            fetch_time += time.perf_counter() - start
+            if doc is None:
+                break
             # convert top-level _id to string so Pydantic string fields validate correctly
             if "_id" in doc:
                 try:
@@ -47,30 +303,239 @@ class DBClient:
                     logging.warning(f"Failed to convert ObjectId to string: {doc['_id']}")
                     pass
             yield doc
+
+        if self.slow_query_ms and fetch_time * 1000 >= self.slow_query_ms:
+            self._log_slow_query(cursor, {"collection": collection_name, **query}, fetch_time * 1000)
     
     def get_order_by_id(self, order_id: str) -> Optional[Order]:
         orders_collection = self.get_collection("orders")
-        data = orders_collection.find_one({"_id": bson.ObjectId(order_id)})
+        data = orders_collection.find_one({"_id": bson.ObjectId(order_id)}, {OUTBOX_FIELD: 0})
+        if data is None and self.archive_after:
+            data = self.get_collection(ARCHIVE_COLLECTION).find_one({"_id": bson.ObjectId(order_id)}, {ARCHIVED_AT_FIELD: 0})
         if data:
             data["_id"] = str(data["_id"])
             return Order.model_validate(dict(data), by_alias=True)
         return None
       
-    def update_order_status(self, order_id: str, new_status: OrderStatus):
+    def update_order_status(
+        self,
+        order_id: str,
+        new_status: OrderStatus,
+        expected_status: Optional[OrderStatus] = None,
+    ) -> Optional[Order]:
+        """Set the status and return the updated order in one round trip.
+
+        When `expected_status` is given the update only applies if the order is
+        still in that status; otherwise OrderStatusConflictError is raised with
+        the status it currently has. Returns None if the order doesn't exist.
+        """
+        if not bson.ObjectId.is_valid(order_id):
+            return None
         orders_collection = self.get_collection("orders")
-        result = orders_collection.update_one(
-            {"_id": bson.ObjectId(order_id)},
-            {"$set": {"status": new_status, "updated_at": datetime.now()}}
+        query: dict[str, Any] = {"_id": bson.ObjectId(order_id)}
+        if expected_status:
+            query["status"] = expected_status
+        now = datetime.now()
+        data = orders_collection.find_one_and_update(
+            query,
+            {
+                "$set": {"status": new_status, "updated_at": now},
+                "$push": {OUTBOX_FIELD: self._outbox_event("orders:updated", now)},
+            },
+            projection={OUTBOX_FIELD: 0},
+            return_document=pymongo.ReturnDocument.AFTER,
         )
-        return result.modified_count > 0
+        if data:
+            data["_id"] = str(data["_id"])
+            return Order.model_validate(dict(data), by_alias=True)
+        if expected_status:
+            # Only the failure path pays for telling "missing" and "changed" apart
+            current = orders_collection.find_one({"_id": query["_id"]}, {"status": 1})
+            if current:
+                raise OrderStatusConflictError(order_id, expected_status, current["status"])
+        return None
       
+    def bulk_update_order_status(
+        self,
+        updates: list[tuple[str, OrderStatus, Optional[OrderStatus]]],
+    ) -> list[tuple[str, BulkUpdateOutcome, Optional[Order]]]:
+        """Apply several (order_id, new_status, expected_status) changes at once.
+
+        All updates go out in a single unordered bulk_write and the results
+        are read back with one $in query, so the cost is two round trips
+        whatever the batch size. Each update is reported as "updated",
+        "not_found" or "conflict" (expected_status no longer matched), with
+        the updated order when it applied. An update applied if the outbox
+        event it pushed is there. Order ids must not repeat, else
+        DuplicateOrderUpdateError is raised before anything is written.
+        """
+        seen: set[str] = set()
+        repeated = sorted({order_id for order_id, _, _ in updates if order_id in seen or seen.add(order_id)})
+        if repeated:
+            raise DuplicateOrderUpdateError(repeated)
+
+        orders_collection = self.get_collection("orders")
+        now = datetime.now()
+        # Mongo stores milliseconds, truncate so the read-back comparison matches
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+        operations = []
+        event_ids: dict[str, bson.ObjectId] = {}
+        for order_id, new_status, expected_status in updates:
+            if not bson.ObjectId.is_valid(order_id):
+                continue
+            query: dict[str, Any] = {"_id": bson.ObjectId(order_id)}
+            if expected_status:
+                query["status"] = expected_status
+            event = self._outbox_event("orders:updated", now)
+            event_ids[order_id] = event["event_id"]
+            operations.append(pymongo.UpdateOne(query, {
+                "$set": {"status": new_status, "updated_at": now},
+                "$push": {OUTBOX_FIELD: event},
+            }))
+        if not operations:
+            return [(order_id, "not_found", None) for order_id, _, _ in updates]
+        orders_collection.bulk_write(operations, ordered=False)
+
+        current = {
+            str(doc["_id"]): doc
+            for doc in orders_collection.find(
+                {"_id": {"$in": [bson.ObjectId(order_id) for order_id in event_ids]}},
+                {f"{OUTBOX_FIELD}.at": 0, f"{OUTBOX_FIELD}.channel": 0, f"{OUTBOX_FIELD}.owner": 0},
+            )
+        }
+        results: list[tuple[str, BulkUpdateOutcome, Optional[Order]]] = []
+        for order_id, new_status, _ in updates:
+            data = current.get(order_id)
+            if data is None:
+                results.append((order_id, "not_found", None))
+                continue
+            pending = {event["event_id"] for event in data.pop(OUTBOX_FIELD, [])}
+            # The relay may already have published and removed the event; then
+            # the write it made is the evidence
+            applied = event_ids[order_id] in pending or (data["status"] == new_status and data.get("updated_at") == now)
+            if applied:
+                data["_id"] = str(data["_id"])
+                results.append((order_id, "updated", Order.model_validate(dict(data), by_alias=True)))
+            else:
+                results.append((order_id, "conflict", None))
+        return results
+
+    def fetch_outbox(self, limit: int, overdue_after: Optional[float] = None) -> list[dict]:
+        """Order documents with pending outbox events.
+
+        By default only those with events written by this instance; with
+        `overdue_after`, those with any event older than that many seconds,
+        e.g. left behind by an instance that stopped before relaying them.
+        """
+        if overdue_after is None:
+            query: dict[str, Any] = {f"{OUTBOX_FIELD}.owner": self.instance_id}
+        else:
+            query = {f"{OUTBOX_FIELD}.at": {"$lt": datetime.now() - timedelta(seconds=overdue_after)}}
+        cursor = self.get_collection("orders").find(query).limit(limit)
+        docs = []
+        for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            docs.append(doc)
+        return docs
+
+    def ack_outbox(self, delivered: dict[str, list[bson.ObjectId]]):
+        """Remove published events (event ids per order id) from their orders' outboxes."""
+        operations = []
+        for order_id, event_ids in delivered.items():
+            object_id = bson.ObjectId(order_id)
+            operations.append(pymongo.UpdateOne(
+                {"_id": object_id},
+                {"$pull": {OUTBOX_FIELD: {"event_id": {"$in": event_ids}}}},
+            ))
+            # Drop the emptied array so the order leaves the partial indexes
+            operations.append(pymongo.UpdateOne(
+                {"_id": object_id, OUTBOX_FIELD: {"$size": 0}},
+                {"$unset": {OUTBOX_FIELD: ""}},
+            ))
+        if operations:
+            self.get_collection("orders").bulk_write(operations, ordered=True)
+
+    def outbox_backlog(self) -> dict:
+        """Number of orders with unpublished events and the age of the oldest event."""
+        orders_collection = self.get_collection("orders")
+        query = {f"{OUTBOX_FIELD}.at": {"$exists": True}}
+        pending = orders_collection.count_documents(query)
+        oldest = orders_collection.find_one(query, {OUTBOX_FIELD: 1}, sort=[(f"{OUTBOX_FIELD}.at", pymongo.ASCENDING)])
+        age = 0.0
+        if oldest:
+            age = (datetime.now() - min(event["at"] for event in oldest[OUTBOX_FIELD])).total_seconds()
+        return {"orders": pending, "oldest_age_seconds": round(max(age, 0.0), 3)}
+
+    def archive_orders(self, limit: int) -> int:
+        """Move up to `limit` orders delivered more than `archive_after` ago to the archive.
+
+        Without transactions the move is a copy then a delete, each safe to
+        repeat: orders are upserted into the archive, then deleted from
+        `orders` only if unchanged since they were read. Orders with
+        unpublished outbox events stay until the relay has sent them. If an
+        order changed in between, its archive copy is removed again; if the
+        process dies in between, the order is briefly in both collections
+        (get_orders skips the duplicate) until the next run finishes the move.
+        Returns the number of orders moved.
+        """
+        if not self.archive_after:
+            return 0
+        orders_collection = self.get_collection("orders")
+        archive = self.get_collection(ARCHIVE_COLLECTION)
+        cutoff = datetime.now() - self.archive_after
+        docs = list(orders_collection.find(
+            {
+                "status": "delivered",
+                OUTBOX_FIELD: {"$exists": False},
+                "$or": [
+                    {"updated_at": {"$lt": cutoff}},
+                    # Orders stored before updated_at was recorded
+                    {"updated_at": None, "created_at": {"$lt": cutoff}},
+                ],
+            },
+            sort=[("updated_at", pymongo.ASCENDING)],
+            limit=limit,
+        ))
+        if not docs:
+            return 0
+
+        archived_at = datetime.now()
+        archive.bulk_write(
+            [pymongo.ReplaceOne({"_id": doc["_id"]}, {**doc, ARCHIVED_AT_FIELD: archived_at}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        deleted = orders_collection.bulk_write(
+            [
+                pymongo.DeleteOne({
+                    "_id": doc["_id"],
+                    "status": "delivered",
+                    "updated_at": doc.get("updated_at"),
+                    OUTBOX_FIELD: {"$exists": False},
+                })
+                for doc in docs
+            ],
+            ordered=False,
+        ).deleted_count
+        if deleted < len(docs):
+            changed = [doc["_id"] for doc in orders_collection.find({"_id": {"$in": [doc["_id"] for doc in docs]}}, {"_id": 1})]
+            if changed:
+                archive.delete_many({"_id": {"$in": changed}})
+        return deleted
+
+    def archive_stats(self) -> dict:
+        """Estimated sizes of both tiers."""
+        return {
+            "hot_orders": self.get_collection("orders").estimated_document_count(),
+            "archived_orders": self.get_collection(ARCHIVE_COLLECTION).estimated_document_count(),
+        }
+
     def get_dishes(self):
         dishes_collection = self.get_collection("dishes")
         # Return an iterator of dicts where ObjectId values are converted to strings
         cursor = dishes_collection.find()
         for doc in cursor:
             # convert top-level _id to string so Pydantic string fields validate correctly
-            logging.info(f"Processing dish document: {doc}")
             if "_id" in doc:
                 try:
                     doc["_id"] = str(doc["_id"])
@@ -87,5 +552,165 @@ class DBClient:
             data["_id"] = str(data["_id"])
             return Dish.model_validate(dict(data), by_alias=True)
         return None
-      
-    
+
+    def get_dishes_by_ids(self, dish_ids: Iterable[str], projection: Optional[dict] = None) -> dict[str, dict]:
+        """Fetch several dishes with a single $in query, keyed by string id.
+
+        Ids that are not valid ObjectIds or don't exist are simply absent
+        from the result.
+        """
+        object_ids = [bson.ObjectId(dish_id) for dish_id in set(dish_ids) if bson.ObjectId.is_valid(dish_id)]
+        if not object_ids:
+            return {}
+        dishes_collection = self.get_collection("dishes")
+        cursor = dishes_collection.find({"_id": {"$in": object_ids}}, projection)
+        return {str(doc["_id"]): doc for doc in cursor}
+
+    def get_dish_costs(self, dish_ids: Iterable[str]) -> dict[str, float]:
+        dishes = self.get_dishes_by_ids(dish_ids, projection={"cost_unit": 1})
+        return {dish_id: dish["cost_unit"] for dish_id, dish in dishes.items()}
+
+
+class AsyncDBClient:
+    """Async facade over DBClient.
+
+    pymongo is blocking, so every call is handed to a bounded thread pool
+    instead of running on the event loop. The pool is sized to the Mongo
+    connection pool by default so threads never queue on a free socket.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        db_name: str,
+        max_pool_size: int = 100,
+        min_pool_size: int = 0,
+        max_workers: Optional[int] = None,
+        slow_query_ms: Optional[float] = None,
+        client: Optional[pymongo.MongoClient] = None,
+        archive_after: Optional[timedelta] = None,
+        archive_retention: Optional[timedelta] = None,
+    ):
+        self.sync = DBClient(
+            uri,
+            db_name,
+            max_pool_size=max_pool_size,
+            min_pool_size=min_pool_size,
+            slow_query_ms=slow_query_ms,
+            client=client,
+            archive_after=archive_after,
+            archive_retention=archive_retention,
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or max_pool_size,
+            thread_name_prefix="mongo",
+        )
+
+    async def run(self, fn: Callable[..., T], *args, op: Optional[str] = None, **kwargs) -> T:
+        """Run a blocking callable on the Mongo executor.
+
+        The time spent queued for a worker thread and the call itself are
+        recorded as the mongo_executor_wait and mongo stages, labelled `op`
+        (the function name by default).
+        """
+        loop = asyncio.get_running_loop()
+        op = op or getattr(fn, "__name__", "call")
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            start = time.perf_counter()
+            metrics.observe_stage("mongo_executor_wait", start - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.observe_stage("mongo", time.perf_counter() - start, op=op)
+
+        return await loop.run_in_executor(self.executor, call)
+
+    async def ensure_indexes(self):
+        await self.run(self.sync.ensure_indexes)
+
+    async def create_order(self, order: Order) -> str:
+        return await self.run(self.sync.create_order, order)
+
+    async def get_orders(
+        self,
+        status: Optional[OrderStatus] = None,
+        type: Optional[OrderType] = None,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+        after: Optional[tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+        fields: Optional[list[str]] = None,
+    ) -> list[dict]:
+        # The cursor has to be drained inside the worker thread, otherwise
+        # each getMore would run on the event loop again.
+        return await self.run(
+            lambda: list(self.sync.get_orders(
+                status=status, type=type, from_date=from_date, to_date=to_date,
+                after=after, limit=limit, fields=fields,
+            )),
+            op="get_orders",
+        )
+
+    async def iter_orders(self, batch_size: int = 500, **filters) -> AsyncIterator[dict]:
+        """Stream get_orders results, pulling `batch_size` documents per executor hop."""
+        orders = self.sync.get_orders(**filters)
+        try:
+            while True:
+                batch = await self.run(lambda: list(itertools.islice(orders, batch_size)), op="iter_orders")
+                if not batch:
+                    return
+                for doc in batch:
+                    yield doc
+        finally:
+            # Closing the generator kills the server-side cursor
+            await self.run(orders.close, op="iter_orders_close")
+
+    async def get_order_by_id(self, order_id: str) -> Optional[Order]:
+        return await self.run(self.sync.get_order_by_id, order_id)
+
+    async def update_order_status(
+        self,
+        order_id: str,
+        new_status: OrderStatus,
+        expected_status: Optional[OrderStatus] = None,
+    ) -> Optional[Order]:
+        return await self.run(self.sync.update_order_status, order_id, new_status, expected_status)
+
+    async def bulk_update_order_status(
+        self,
+        updates: list[tuple[str, OrderStatus, Optional[OrderStatus]]],
+    ) -> list[tuple[str, BulkUpdateOutcome, Optional[Order]]]:
+        return await self.run(self.sync.bulk_update_order_status, updates)
+
+    async def fetch_outbox(self, limit: int, overdue_after: Optional[float] = None) -> list[dict]:
+        return await self.run(self.sync.fetch_outbox, limit, overdue_after)
+
+    async def ack_outbox(self, delivered: dict[str, list[bson.ObjectId]]):
+        await self.run(self.sync.ack_outbox, delivered)
+
+    async def outbox_backlog(self) -> dict:
+        return await self.run(self.sync.outbox_backlog)
+
+    async def archive_orders(self, limit: int) -> int:
+        return await self.run(self.sync.archive_orders, limit)
+
+    async def archive_stats(self) -> dict:
+        return await self.run(self.sync.archive_stats)
+
+    async def get_dishes(self) -> list[dict]:
+        return await self.run(lambda: list(self.sync.get_dishes()), op="get_dishes")
+
+    async def get_dish_by_id(self, dish_id: str) -> Optional[Dish]:
+        return await self.run(self.sync.get_dish_by_id, dish_id)
+
+    async def get_dishes_by_ids(self, dish_ids: Iterable[str], projection: Optional[dict] = None) -> dict[str, dict]:
+        return await self.run(self.sync.get_dishes_by_ids, list(dish_ids), projection)
+
+    async def get_dish_costs(self, dish_ids: Iterable[str]) -> dict[str, float]:
+        return await self.run(self.sync.get_dish_costs, list(dish_ids))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.sync.client.close()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from app.database.models import OrderStatus
+from typing import Optional, Literal
+from app.database.models import Order, OrderStatus
 
 class SessionData(BaseModel):
     email: str
@@ -15,4 +15,16 @@ class LoginResponse(BaseModel):
     role: Optional[str] = None
     
 class UpdateOrderStatusRequest(BaseModel):
-    status: OrderStatus
\ No newline at end of file
+    status: OrderStatus
+    # Compare-and-set guard: only apply if the order is still in this status
+    expected_status: Optional[OrderStatus] = None
+
+class OrderStatusUpdate(BaseModel):
+    order_id: str
+    status: OrderStatus
+    expected_status: Optional[OrderStatus] = None
+
+class OrderStatusUpdateResult(BaseModel):
+    order_id: str
+    result: Literal["updated", "not_found", "conflict"]
+    order: Optional[Order] = None
\ No newline at end of file
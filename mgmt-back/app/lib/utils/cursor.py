@@ -0,0 +1,20 @@
+import base64
+from datetime import datetime
+import bson
+
+
+def encode_cursor(created_at: datetime, order_id: str) -> str:
+    """Encode a (created_at, _id) keyset position as an opaque token."""
+    raw = f"{created_at.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(token: str) -> tuple[datetime, str]:
+    """Inverse of encode_cursor. Raises ValueError on malformed tokens."""
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8").split("|")
+        position = datetime.fromisoformat(created_at), order_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if not bson.ObjectId.is_valid(order_id):
+        raise ValueError(f"Invalid cursor: {token}")
+    return position
@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Naive UTC, the form pymongo returns datetimes in.
+
+    Clients such as the deliveries backend and the register terminals send
+    timezone-aware ISO timestamps ("...Z", "+02:00"); comparing those with
+    naive ones raises TypeError. Naive values are assumed to be UTC already.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
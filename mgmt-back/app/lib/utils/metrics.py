@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Literal
+
+MetricType = Literal["counter", "gauge", "histogram"]
+# (name, type, help, labels, value) as produced by collectors
+Sample = tuple[str, MetricType, str, dict[str, str], float]
+
+# Seconds, from sub-millisecond cache hits up to stalled broker confirms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+NAMESPACE = "mgmt"
+
+
+def _labels(labels: dict[str, str], extra: str = "") -> str:
+    pairs = [f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items())]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of one labelled time series."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide histograms and counters, rendered in Prometheus text format.
+
+    Hot-path stages are timed into `<namespace>_stage_seconds{stage=...}`.
+    Numbers that services already keep in their stats() are not duplicated:
+    collectors registered with add_collector() turn them into samples when
+    /metrics is scraped. Observations may come from executor threads, so
+    updates take a lock.
+    """
+
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.help: dict[str, tuple[MetricType, str]] = {}
+        self.histograms: dict[str, dict[tuple[tuple[str, str], ...], Histogram]] = {}
+        self.counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = {}
+        self.collectors: list[Callable[[], Iterable[Sample]]] = []
+        self.describe("stage_seconds", "histogram", "Time spent per request stage")
+
+    def describe(self, name: str, kind: MetricType, help: str):
+        self.help[name] = (kind, help)
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def observe_stage(self, stage: str, seconds: float, **labels: str):
+        self.observe("stage_seconds", seconds, stage=stage, **labels)
+
+    @contextmanager
+    def time_stage(self, stage: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, **labels)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Register a callable returning samples read at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def header(name: str, kind: MetricType, help: str = ""):
+            # In the text format a counter's HELP and TYPE name its _total samples
+            full = f"{self.namespace}_{name}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {full} {help or self.help.get(name, (kind, name))[1]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self.lock:
+            histograms = {name: {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in series.items()}
+                          for name, series in self.histograms.items()}
+            counters = {name: dict(series) for name, series in self.counters.items()}
+
+        for name, series in sorted(histograms.items()):
+            full = header(name, "histogram")
+            for key, (counts, total, count, buckets) in sorted(series.items()):
+                labels = dict(key)
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, float("inf")), counts):
+                    cumulative += bucket_count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{full}_bucket{_labels(labels, le)} {cumulative}")
+                lines.append(f"{full}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{full}_count{_labels(labels)} {count}")
+
+        for name, series in sorted(counters.items()):
+            full = header(name, "counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full}{_labels(dict(key))} {_number(value)}")
+
+        # Collected samples are grouped by name so each family gets one header
+        collected: dict[str, tuple[MetricType, str, list[tuple[dict[str, str], float]]]] = {}
+        for collector in self.collectors:
+            for name, kind, help, labels, value in collector():
+                collected.setdefault(name, (kind, help, []))[2].append((labels, value))
+        for name, (kind, help, samples) in collected.items():
+            full = header(name, kind, help)
+            for labels, value in samples:
+                lines.append(f"{full}{_labels(labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
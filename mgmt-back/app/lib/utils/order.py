@@ -1,13 +1,49 @@
+from typing import Iterable, Mapping
+from pydantic import TypeAdapter
 from app.database.models import Order, OrderItem
-from app.database.mongo import DBClient
-def get_dish_cost(dish_id: str, db_client: DBClient):
-    dish = db_client.get_dish_by_id(dish_id)
-    return dish.cost_unit if dish else 0
 
-def order_from_items(items: list[OrderItem], db_client: DBClient) -> Order:
+order_list_adapter = TypeAdapter(list[Order])
+
+
+class UnknownDishError(ValueError):
+    def __init__(self, dish_ids: list[str]):
+        self.dish_ids = dish_ids
+        super().__init__(f"Unknown dish ids: {', '.join(dish_ids)}")
+
+
+ORDER_FIELDS = {field.alias or name for name, field in Order.model_fields.items()}
+
+
+def parse_order_fields(fields: str) -> list[str]:
+    """Parse a comma-separated field list for projected order queries.
+
+    created_at is always kept since it is part of the pagination cursor.
+    """
+    requested = {"_id" if field == "id" else field for field in (f.strip() for f in fields.split(",")) if field}
+    unknown = requested - ORDER_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown order fields: {', '.join(sorted(unknown))}")
+    return sorted(requested | {"created_at"})
+
+def orders_json(docs: list[dict]) -> bytes:
+    """Validate order documents and serialize them to a JSON array in one pass each."""
+    return order_list_adapter.dump_json(order_list_adapter.validate_python(docs), by_alias=True)
+
+def dish_ids_of(items: Iterable[OrderItem]) -> set[str]:
+    return {item.id_dish for item in items}
+
+def order_from_items(items: list[OrderItem], dish_costs: Mapping[str, float]) -> Order:
+    """Price an order from a single bulk lookup of dish costs.
+
+    Raises UnknownDishError listing every dish id missing from dish_costs.
+    """
+    missing = sorted(dish_ids_of(items) - dish_costs.keys())
+    if missing:
+        raise UnknownDishError(missing)
+
     total_cost = sum(
         item.quantity * (
-            get_dish_cost(item.id_dish, db_client) +
+            dish_costs[item.id_dish] +
             sum(extra.cost for extra in (item.selected_extras or []))
         )
         for item in items
@@ -19,4 +55,4 @@ def order_from_items(items: list[OrderItem], db_client: DBClient) -> Order:
         total_cost=total_cost,
         status="preparing",
         type="dinein"
-    )
\ No newline at end of file
+    )
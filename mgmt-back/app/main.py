@@ -1,43 +1,183 @@
 import json
-from fastapi import FastAPI, HTTPException, Header, Depends, Query, WebSocket, WebSocketDisconnect
+import ipaddress
+import math
+import secrets
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
-from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Literal
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-import asyncio
+from pydantic import ValidationError
 
-from app.database.mongo import DBClient
-from app.services.auth.auth import AuthService
-from app.services.pubsub.rabbit import RabbitPubSubService
-from app.services.ws.connection_manager import ConnectionManager
-from app.lib.utils.order import order_from_items
+from app.database.ldap import LDAPUnavailableError
+from app.database.mongo import AsyncDBClient, DuplicateOrderUpdateError, OrderStatusConflictError
+from app.services.auth.auth import AuthService, LoginThrottledError
+from app.services.session.session import SessionService
+from app.services.catalog.catalog import DishCatalog
+from app.services.health.health import StartupTasks
+from app.services.diagnostics.diagnostics import LoopLagMonitor, RequestTimingMiddleware, SamplingProfiler
+from app.services.orders.active import ActiveOrdersView
+from app.services.pubsub.publisher import RabbitPublisher
+from app.services.outbox.outbox import OutboxRelay
+from app.services.archive.archive import OrderArchiver
+from app.services.pubsub.rabbit import RabbitPubSubService, get_codec
+from app.services.ws.connection_manager import ConnectionManager, Subscription
+from app.services.ws.coalescer import OrderCoalescer
+from app.lib.utils.cursor import decode_cursor, encode_cursor
+from app.lib.utils.metrics import Sample, metrics
+from app.lib.utils.order import UnknownDishError, dish_ids_of, order_from_items, order_list_adapter, orders_json, parse_order_fields
 from app.database.models import OrderStatus, OrderType, Order, Dish, OrderItem
-from app.lib.types.http import LoginRequest, LoginResponse, SessionData, UpdateOrderStatusRequest
+from app.lib.types.http import (
+    LoginRequest,
+    LoginResponse,
+    OrderStatusUpdate,
+    OrderStatusUpdateResult,
+    SessionData,
+    UpdateOrderStatusRequest,
+)
 
 load_dotenv()
 
 
 
-# Initialize services
+# Initialize services. APP_BACKEND=memory swaps Mongo, Redis, RabbitMQ and
+# LDAP for in-process stand-ins (see app/services/memory) to run and load
+# test the API without the rest of the stack.
+app_backend = os.getenv("APP_BACKEND", "services")
+if app_backend not in ("services", "memory"):
+    raise ValueError(f"Unknown APP_BACKEND: {app_backend}")
+memory_backend = app_backend == "memory"
+if memory_backend:
+    from app.services.memory.memory import (
+        InMemoryPubSubService,
+        StubLDAPDatabase,
+        memory_mongo_client,
+        memory_redis_client,
+    )
+
 mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
 mongo_db_name = os.getenv("MONGODB_DB_NAME", "deliveries_db")
-db_client = DBClient(mongo_uri, mongo_db_name)
-pubsub = RabbitPubSubService(
+# Orders delivered longer ago than this move to orders_archive; 0 keeps them all in orders
+archive_after_hours = float(os.getenv("ARCHIVE_AFTER_HOURS", 24))
+# Archived orders expire this long after being archived; 0 keeps them forever
+archive_retention_days = float(os.getenv("ARCHIVE_RETENTION_DAYS", 0))
+db_client = AsyncDBClient(
+    mongo_uri,
+    mongo_db_name,
+    max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", 100)),
+    min_pool_size=int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+    max_workers=int(os.getenv("MONGODB_EXECUTOR_WORKERS", 0)) or None,
+    slow_query_ms=float(os.getenv("MONGODB_SLOW_QUERY_MS", 0)) or None,
+    client=memory_mongo_client(mongo_db_name, int(os.getenv("MEMORY_SEED_DISHES", 20))) if memory_backend else None,
+    archive_after=timedelta(hours=archive_after_hours) if archive_after_hours else None,
+    archive_retention=timedelta(days=archive_retention_days) if archive_retention_days else None,
+)
+rabbitmq_delivery_mode = os.getenv("RABBITMQ_DELIVERY_MODE", "work")
+pubsub_codec = get_codec(os.getenv("RABBITMQ_CODEC", "json"))
+pubsub = InMemoryPubSubService(codec=pubsub_codec) if memory_backend else RabbitPubSubService(
     host=os.getenv("RABBITMQ_HOST", "rabbitmq"),
     port=int(os.getenv("RABBITMQ_PORT", 5672)),
     user=os.getenv("RABBITMQ_USER", "admin"),
-    password=os.getenv("RABBITMQ_PASSWORD", "admin")
+    password=os.getenv("RABBITMQ_PASSWORD", "admin"),
+    mode=rabbitmq_delivery_mode,  # type: ignore[arg-type]
+    connect_timeout=float(os.getenv("RABBITMQ_CONNECT_TIMEOUT", 10)),
+    # json (orjson) or msgpack; switch to msgpack only once every consumer decodes it
+    codec=pubsub_codec,
+    publisher=RabbitPublisher(
+        pool_size=int(os.getenv("RABBITMQ_PUBLISHER_CHANNELS", 4)),
+        linger_ms=float(os.getenv("RABBITMQ_PUBLISH_LINGER_MS", 0)),
+        max_batch=int(os.getenv("RABBITMQ_PUBLISH_MAX_BATCH", 50)),
+        buffer_size=int(os.getenv("RABBITMQ_PUBLISH_BUFFER", 1000)),
+        # Broadcast instance queues are transient, persisting buys nothing
+        persistent=rabbitmq_delivery_mode == "work",
+    ),
+)
+catalog = DishCatalog(
+    db_client,
+    ttl=float(os.getenv("DISH_CATALOG_TTL", 300)),
+    max_entries=int(os.getenv("DISH_CATALOG_MAX_ENTRIES", 5000)),
+)
+active_orders = ActiveOrdersView(db_client, reconcile_interval=float(os.getenv("ACTIVE_ORDERS_RECONCILE_INTERVAL", 60)))
+archiver = OrderArchiver(
+    db_client,
+    interval=float(os.getenv("ARCHIVE_INTERVAL", 300)),
+    batch_size=int(os.getenv("ARCHIVE_BATCH_SIZE", 500)),
+)
+outbox_relay = OutboxRelay(
+    db_client,
+    pubsub,
+    batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", 100)),
+    poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", 1)),
+    overdue_after=float(os.getenv("OUTBOX_OVERDUE_AFTER", 30)),
+)
+auth_service = AuthService(
+    ldap_db=StubLDAPDatabase(os.getenv("MEMORY_LDAP_PASSWORD", "bench")) if memory_backend else None,  # type: ignore[arg-type]
+    session_service=SessionService(client=memory_redis_client()) if memory_backend else None,
+)
+manager = ConnectionManager(
+    max_queue=int(os.getenv("WS_QUEUE_SIZE", 100)),
+    policy=os.getenv("WS_SLOW_CLIENT_POLICY", "drop_oldest"),  # type: ignore[arg-type]
+    replay_size=int(os.getenv("WS_REPLAY_BUFFER_SIZE", 1000)),
+    # Sequenced clients that cannot be caught up from the replay buffer start over from the active orders
+    snapshot=lambda: [order.model_dump(mode='json', by_alias=True) for order in active_orders.orders.values()],
 )
-auth_service = AuthService()
-manager = ConnectionManager()
+coalescer = OrderCoalescer(manager, window_ms=float(os.getenv("WS_COALESCE_MS", 0)))
+loop_lag = LoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", 250)) / 1000)
+profiler = SamplingProfiler(interval_ms=float(os.getenv("PROFILER_INTERVAL_MS", 5)))
+
+startup = StartupTasks(
+    retry_interval=float(os.getenv("STARTUP_RETRY_INTERVAL", 1)),
+    max_retry_interval=float(os.getenv("STARTUP_MAX_RETRY_INTERVAL", 30)),
+)
+
+async def start_mongo():
+    await db_client.ensure_indexes()
+    await active_orders.start()
+    if archive_after_hours:
+        await archiver.start()
+
+async def start_redis():
+    await auth_service.session_service.redis.ping()
+
+async def start_rabbitmq():
+    # Each call skips what an earlier attempt already did, so a retry never consumes a channel twice
+    await pubsub.connect()
+    await subscribe_to_orders()
+    # Pending events wait in the order outboxes until there is a broker to publish to
+    await outbox_relay.start()
+
+async def warm_up_ldap():
+    await auth_service.ldap_db.run(auth_service.ldap_db.warm_up)
+
+startup.add("mongo", start_mongo)
+startup.add("redis", start_redis)
+startup.add("rabbitmq", start_rabbitmq)
+# Only logins need LDAP, and they open connections on demand anyway
+startup.add("ldap", warm_up_ldap, required=False)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await pubsub.connect()
-    asyncio.create_task(subscribe_to_orders())
+    # Nothing here waits on a dependency: the steps run concurrently in the
+    # background and /readyz turns 200 once the required ones are done
+    await startup.start()
+    auth_service.session_service.start_invalidation_listener()
+    await loop_lag.start()
     yield
+    await startup.stop()
+    await loop_lag.stop()
+    profiler.stop()
+    await outbox_relay.stop()
+    archiver.stop()
+    active_orders.stop()
+    await pubsub.close()
+    await coalescer.close()
+    await auth_service.session_service.stop_invalidation_listener()
+    auth_service.ldap_db.close()
+    db_client.close()
 
 app = FastAPI(title="DashDish Management API", lifespan=lifespan)
 
@@ -48,25 +188,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(RequestTimingMiddleware)
 
 async def subscribe_to_orders():
-    async def order_callback(message: dict):
-        await manager.broadcast(json.dumps(message))
+    async def order_callback(message: dict | list[dict], body: Optional[bytes]):
+        # A single JSON order goes to the screens as it came off the queue;
+        # batched publishes carry a list of orders, encoded again one by one
+        if isinstance(message, dict):
+            active_orders.apply(message)
+            await coalescer.add(message, body.decode('utf-8') if body is not None else None)
+            return
+        for order in message:
+            active_orders.apply(order)
+            await coalescer.add(order)
+
+    await pubsub.sub("orders:new", order_callback, raw=True)
+    await pubsub.sub("orders:updated", order_callback, raw=True)
+
+    async def dishes_callback(message: dict):
+        catalog.invalidate()
 
-    await pubsub.sub("orders:new", order_callback)
-    await pubsub.sub("orders:updated", order_callback)
+    await pubsub.sub("dishes:invalidated", dishes_callback)
+
+# Peers allowed to report the client address in X-Real-IP, e.g. "172.25.0.2,10.0.0.0/8".
+# Anyone else could set the header to dodge the per-IP login limit.
+trusted_proxies = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+def client_ip(request: Request) -> Optional[str]:
+    peer = request.client.host if request.client else None
+    forwarded = request.headers.get("x-real-ip")
+    if not peer or not forwarded:
+        return peer
+    try:
+        address = ipaddress.ip_address(peer)
+    except ValueError:
+        return peer
+    return forwarded if any(address in proxy for proxy in trusted_proxies) else peer
 
 # Dependency to check session
-def get_current_user(session_id: str = Header(..., alias="session-id")):
-    user = auth_service.get_current_user(session_id)
+async def get_current_user(session_id: str = Header(..., alias="session-id")):
+    user = await auth_service.get_current_user(session_id)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid session")
     return user
 
 @app.post("/login")
-def login(request: LoginRequest, response_model=LoginResponse):
-    login_response = auth_service.login(request.email, request.password)
+async def login(request: LoginRequest, http_request: Request, response_model=LoginResponse):
+    # Behind nginx the peer is the proxy, the client address comes in X-Real-IP
+    source_ip = client_ip(http_request)
+    try:
+        login_response = await auth_service.login(request.email, request.password, source_ip)
+    except LoginThrottledError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except LDAPUnavailableError:
+        raise HTTPException(status_code=503, detail="Authentication service unavailable")
     if not login_response:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return login_response
@@ -77,43 +257,113 @@ async def get_orders(
     type: Optional[OrderType] = None,
     from_date: Optional[datetime] = None,
     to_date: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
     current_user: SessionData = Depends(get_current_user)
 ):
-    orders = list(db_client.get_orders(status=status, type=type, from_date=from_date, to_date=to_date))
-    result = []
-    for order in orders:
-        order_dict = dict(order)
-        result.append(Order.model_validate(order_dict, by_alias=True))
-    return result
+    try:
+        cursor = decode_cursor(after) if after else None
+        projection = parse_order_fields(fields) if fields else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    filters = dict(
+        status=status, type=type, from_date=from_date, to_date=to_date,
+        after=cursor, limit=limit, fields=projection,
+    )
+
+    # Plain active-status queries (the kitchen screens' poll) are answered from memory
+    if format == "json" and not any((from_date, to_date, after, limit, projection)) and active_orders.serves(status):
+        assert status is not None
+        # Already validated Order objects, only serialization is left
+        body = order_list_adapter.dump_json(active_orders.query(status, type), by_alias=True)
+        return Response(content=body, media_type="application/json")
+
+    if format == "ndjson":
+        async def stream_orders():
+            async for doc in db_client.iter_orders(**filters):
+                if projection:
+                    yield json.dumps(jsonable_encoder(doc)) + "\n"
+                else:
+                    yield Order.model_validate(doc, by_alias=True).model_dump_json(by_alias=True) + "\n"
+
+        return StreamingResponse(stream_orders(), media_type="application/x-ndjson")
+
+    orders = await db_client.get_orders(**filters)
+    headers = {}
+    if limit and len(orders) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(orders[-1]["created_at"], orders[-1]["_id"])
+    if projection:
+        # Partial documents can't satisfy response_model, send them as-is
+        return JSONResponse(content=jsonable_encoder(orders), headers=headers)
+
+    # Validated and serialized once here; returning a Response skips response_model
+    with metrics.time_stage("order_validation"):
+        body = orders_json(orders)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/orders", response_model=Order)
 async def create_order(items: List[OrderItem], current_user: SessionData = Depends(get_current_user)):
-    order = order_from_items(items, db_client)
-    order_id = db_client.create_order(order)
+    dish_costs = await catalog.get_dish_costs(dish_ids_of(items))
+    try:
+        order = order_from_items(items, dish_costs)
+    except UnknownDishError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "dish_ids": e.dish_ids})
+    order.id_user = current_user.email
+    order_id = await db_client.create_order(order)
     order.id = order_id
-    
-    await pubsub.pub("orders:new", order.model_dump(mode='json', by_alias=True))
+    active_orders.apply(order)
+    # The orders:new event was stored with the order, the relay publishes it
+    outbox_relay.notify()
     return order
 
+@app.put("/orders/status", response_model=List[OrderStatusUpdateResult])
+async def bulk_update_order_status(updates: List[OrderStatusUpdate], current_user: SessionData = Depends(get_current_user)):
+    try:
+        results = await db_client.bulk_update_order_status(
+            [(update.order_id, update.status, update.expected_status) for update in updates]
+        )
+    except DuplicateOrderUpdateError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "order_ids": e.order_ids})
+    updated = False
+    for _, _, order in results:
+        if order:
+            active_orders.apply(order)
+            updated = True
+    if updated:
+        outbox_relay.notify()
+    return [OrderStatusUpdateResult(order_id=order_id, result=result, order=order) for order_id, result, order in results]
+
 @app.put("/orders/{order_id}/status", response_model=Order)
 async def update_order_status(order_id: str, request: UpdateOrderStatusRequest, current_user: SessionData = Depends(get_current_user)):
-    success = db_client.update_order_status(order_id, request.status)
-    if not success:
-        raise HTTPException(status_code=404, detail="Order not found")
-    order = db_client.get_order_by_id(order_id)
+    try:
+        order = await db_client.update_order_status(order_id, request.status, request.expected_status)
+    except OrderStatusConflictError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "status": e.current_status})
     if order:
-        await pubsub.pub("orders:updated", order.model_dump(mode='json', by_alias=True))
+        active_orders.apply(order)
+        outbox_relay.notify()
         return order
     raise HTTPException(status_code=404, detail="Order not found")
 
 @app.get("/dishes", response_model=List[Dish])
 async def get_dishes(current_user: dict = Depends(get_current_user)):
-    dishes = list(db_client.get_dishes())
-    result = []
-    for dish in dishes:
-        dish_dict = dict(dish)
-        result.append(Dish.model_validate(dish_dict, by_alias=True))
-    return result
+    return Response(content=await catalog.get_dishes_json(), media_type="application/json")
+
+@app.post("/dishes/invalidate", status_code=204)
+async def invalidate_dishes(current_user: SessionData = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    catalog.invalidate()
+    try:
+        await pubsub.pub("dishes:invalidated", {})
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Catalog invalidated here, but not on other instances: {e}")
+
+@app.get("/dishes/cache")
+async def get_dishes_cache_stats(current_user: SessionData = Depends(get_current_user)):
+    return catalog.stats()
 
 @app.websocket("/ws/orders")
 async def websocket_endpoint(websocket: WebSocket):
@@ -124,16 +374,165 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=1008, reason="Missing session-id")
         return
     
-    current_user = auth_service.get_current_user(session_id)
+    current_user = await auth_service.get_current_user(session_id)
     if not current_user:
         await websocket.close(code=1008, reason="Invalid or expired session")
         return
     
+    # Optional filters, e.g. ?status=preparing&status=done&type=dinein&mine=true
+    params = websocket.query_params
+    try:
+        subscription = Subscription(
+            status=params.getlist("status") or None,
+            type=params.getlist("type") or None,
+            mine=params.get("mine", "false").lower() == "true",
+        )
+    except ValidationError:
+        await websocket.close(code=1008, reason="Invalid subscription filters")
+        return
+
+    # Opt-in sequenced protocol: ?seq=true for a snapshot then deltas, or
+    # ?epoch=...&last_seq=N to resume after a reconnect
+    resume = None
+    if "last_seq" in params:
+        try:
+            resume = (params.get("epoch"), int(params["last_seq"]))
+        except ValueError:
+            await websocket.close(code=1008, reason="Invalid last_seq")
+            return
+    sequenced = resume is not None or params.get("seq", "false").lower() == "true"
+    # ?batch=true: one JSON array frame per broadcast instead of one frame per order.
+    # Compression is per client too: permessage-deflate is used when the
+    # client offers it in the handshake (and UVICORN_WS_PER_MESSAGE_DEFLATE is not false)
+    batch = params.get("batch", "false").lower() == "true"
+
     # Accept connection
-    await manager.connect(websocket)
+    await manager.connect(
+        websocket,
+        user=current_user.email,
+        subscription=subscription,
+        sequenced=sequenced,
+        resume=resume,
+        batch=batch,
+    )
     try:
         while True:
-            # Keep the connection alive
-            await websocket.receive_text()
+            # Clients may change their filters by sending
+            # {"action": "subscribe", "status": [...], "type": [...], "mine": bool};
+            # anything else just keeps the connection alive
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if isinstance(message, dict) and message.pop("action", None) == "subscribe":
+                    manager.subscribe(websocket, Subscription.model_validate(message))
+            except (ValueError, ValidationError):
+                pass
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
+
+@app.get("/outbox/stats")
+async def get_outbox_stats(current_user: SessionData = Depends(get_current_user)):
+    return {**outbox_relay.stats(), "backlog": await db_client.outbox_backlog()}
+
+@app.get("/orders/archive/stats")
+async def get_archive_stats(current_user: SessionData = Depends(get_current_user)):
+    return {**archiver.stats(), **await db_client.archive_stats()}
+
+@app.get("/pubsub/stats")
+async def get_pubsub_stats(current_user: SessionData = Depends(get_current_user)):
+    return pubsub.publisher.stats() if pubsub.publisher else {}
+
+@app.get("/sessions/cache")
+async def get_sessions_cache_stats(current_user: SessionData = Depends(get_current_user)):
+    return auth_service.session_service.cache.stats()
+
+@app.get("/auth/stats")
+async def get_auth_stats(current_user: SessionData = Depends(get_current_user)):
+    return auth_service.stats()
+
+@app.get("/orders/active/stats")
+async def get_active_orders_stats(current_user: SessionData = Depends(get_current_user)):
+    return active_orders.stats()
+
+@app.get("/ws/stats")
+async def get_ws_stats(current_user: SessionData = Depends(get_current_user)):
+    return {**manager.stats(), "coalescer": coalescer.stats()}
+
+def service_samples() -> list[Sample]:
+    """Counters and gauges the services already keep, read when /metrics is scraped."""
+    session_cache = auth_service.session_service.cache
+    auth_stats = auth_service.stats()
+    clients = list(manager.active_connections.values())
+    samples: list[Sample] = [
+        ("session_cache_hits", "counter", "Sessions served from the local cache", {}, session_cache.hits),
+        ("session_cache_misses", "counter", "Sessions looked up in Redis", {}, session_cache.misses),
+        ("session_cache_entries", "gauge", "Sessions in the local cache", {}, len(session_cache.entries)),
+        ("dish_catalog_hits", "counter", "Dish lookups served from the catalog cache", {}, catalog.hits),
+        ("dish_catalog_misses", "counter", "Dish catalog loads from Mongo", {}, catalog.misses),
+        ("ldap_lookup_cache_hits", "counter", "LDAP user lookups served from cache", {}, auth_stats["lookup_cache"]["hits"]),
+        ("ldap_lookup_cache_misses", "counter", "LDAP user lookups sent to the directory", {}, auth_stats["lookup_cache"]["misses"]),
+        ("ws_connections", "gauge", "Connected WebSocket clients", {}, len(clients)),
+        ("ws_queued_messages", "gauge", "Messages waiting in WebSocket client queues", {}, sum(len(client.queue) for client in clients)),
+        ("ws_coalescer_pending", "gauge", "Order events held back by the coalescer", {}, len(coalescer.pending)),
+        ("active_orders", "gauge", "Orders in the in-memory active orders view", {}, len(active_orders.orders)),
+        ("orders_archived", "counter", "Delivered orders moved to the archive collection", {}, archiver.archived),
+        ("outbox_events_published", "counter", "Order events published by the outbox relay", {}, outbox_relay.published),
+        ("outbox_lag_seconds", "gauge", "Time from order write to broker confirm of the last relayed batch", {}, outbox_relay.last_lag_ms / 1000),
+        ("event_loop_lag_max_seconds", "gauge", "Largest event loop lag seen since startup", {}, loop_lag.max_lag),
+        ("ready", "gauge", "Whether every required dependency has been initialized", {}, float(startup.ready)),
+    ]
+    for pool_name, pool in auth_stats["ldap"].items():
+        if isinstance(pool, dict):
+            samples.append(("ldap_pool_waits", "counter", "LDAP operations that waited for a pooled connection", {"pool": pool_name}, pool["waits"]))
+    if pubsub.publisher:
+        publisher = pubsub.publisher
+        samples += [
+            ("publisher_buffered", "gauge", "Events waiting in the RabbitMQ publisher buffer", {}, publisher.buffer.qsize()),
+            ("publisher_failures", "counter", "Failed RabbitMQ publish attempts", {}, publisher.failures),
+        ]
+    return samples
+
+metrics.add_collector(service_samples)
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness only: the process is up and its event loop answers
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    return JSONResponse(content=startup.stats(), status_code=200 if startup.ready else 503)
+
+# Scrapers can't hold a session, so /metrics takes a static bearer token instead.
+# nginx proxies /orders/ to this service and denies /orders/metrics; set
+# METRICS_TOKEN too, since register_net reaches this service directly.
+metrics_token = os.getenv("METRICS_TOKEN")
+
+@app.get("/metrics")
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    if metrics_token and not secrets.compare_digest(authorization or "", f"Bearer {metrics_token}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/profiler/start", status_code=202)
+async def start_profiler(
+    seconds: float = Query(30, gt=0, le=600),
+    current_user: SessionData = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not profiler.start(seconds):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return {"running": True, "seconds": seconds}
+
+@app.post("/profiler/stop", status_code=204)
+async def stop_profiler(current_user: SessionData = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    profiler.stop()
+
+@app.get("/profiler")
+async def get_profile(limit: int = Query(25, ge=1, le=500), current_user: SessionData = Depends(get_current_user)):
+    return {**profiler.report(limit), "loop_lag": loop_lag.stats()}
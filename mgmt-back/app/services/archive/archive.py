@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from app.database.mongo import AsyncDBClient
+
+
+class OrderArchiver:
+    """Periodically moves long-delivered orders out of the hot `orders` collection.
+
+    Every `interval` seconds it calls DBClient.archive_orders in batches of
+    `batch_size` until no eligible orders are left, so `orders` stays about
+    as big as the recent and active orders. Several instances may run it at
+    once; the move is idempotent.
+    """
+
+    def __init__(self, db_client: AsyncDBClient, interval: float = 300, batch_size: int = 500):
+        self.db_client = db_client
+        self.interval = interval
+        self.batch_size = batch_size
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.archived = 0
+        self.failures = 0
+        self.last_archived = 0
+        self.last_run_ms = 0.0
+
+    async def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self.archive()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logging.warning(f"Archiving delivered orders failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def archive(self) -> int:
+        """Archive every eligible order now. Returns how many were moved."""
+        start = time.perf_counter()
+        archived = 0
+        while True:
+            moved = await self.db_client.archive_orders(self.batch_size)
+            archived += moved
+            if moved < self.batch_size:
+                break
+        self.runs += 1
+        self.archived += archived
+        self.last_archived = archived
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        if archived:
+            logging.info(f"Archived {archived} delivered orders in {self.last_run_ms:.0f} ms")
+        return archived
+
+    def stats(self) -> dict:
+        return {
+            "running": self.task is not None,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "archived": self.archived,
+            "last_archived": self.last_archived,
+            "last_run_ms": round(self.last_run_ms, 1),
+            "failures": self.failures,
+        }
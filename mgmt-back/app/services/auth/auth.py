@@ -1,31 +1,91 @@
 from ...database.ldap import LDAPDatabase
+from ...database.models import LDAPUser
 from ..session.session import SessionService
+from .throttle import TokenBucketLimiter, TTLCache
 from typing import Optional
 from app.lib.types.http import SessionData, LoginResponse
+import os
+
+
+class LoginThrottledError(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Too many login attempts, retry in {retry_after:.0f}s")
 
 
 class AuthService:
-    def __init__(self):
-        self.ldap_db = LDAPDatabase()
-        self.session_service = SessionService()
+    def __init__(self, ldap_db: Optional[LDAPDatabase] = None, session_service: Optional[SessionService] = None):
+        self.ldap_db = ldap_db or LDAPDatabase()
+        self.session_service = session_service or SessionService()
+        # email -> (dn, role), or None for unknown emails
+        self.lookup_cache: TTLCache[Optional[tuple[str, str]]] = TTLCache(
+            max_entries=int(os.getenv('LOGIN_CACHE_SIZE', 1000))
+        )
+        self.lookup_ttl = float(os.getenv('LOGIN_CACHE_TTL', 60))
+        self.negative_lookup_ttl = float(os.getenv('LOGIN_NEGATIVE_CACHE_TTL', 15))
+        self.identity_limiter = TokenBucketLimiter(
+            rate=float(os.getenv('LOGIN_IDENTITY_RATE_PER_MIN', 10)) / 60,
+            burst=int(os.getenv('LOGIN_IDENTITY_BURST', 5)),
+        )
+        self.ip_limiter = TokenBucketLimiter(
+            rate=float(os.getenv('LOGIN_IP_RATE_PER_MIN', 60)) / 60,
+            burst=int(os.getenv('LOGIN_IP_BURST', 20)),
+        )
 
-    def login(self, email: str, password: str) -> Optional[LoginResponse]:
+    async def _find_user(self, email: str) -> Optional[tuple[str, str]]:
+        found, user = self.lookup_cache.get(email)
+        if found:
+            return user
+        user = await self.ldap_db.run(self.ldap_db.find_user, email)
+        self.lookup_cache.put(email, user, self.lookup_ttl if user else self.negative_lookup_ttl)
+        return user
+
+    async def login(self, email: str, password: str, source_ip: Optional[str] = None) -> Optional[LoginResponse]:
         """
         Authenticate user with LDAP and create a session.
         Returns session_id if successful, None otherwise.
+        Raises LoginThrottledError when the identity or source IP is over its rate,
+        and LDAPUnavailableError when the directory can't be reached.
         """
-        user = self.ldap_db.authenticate(email, password)
-        if user:
-            # Create session with user data (excluding password)
-            session_data = SessionData(email=user.email, role=user.role)
-            session_id = self.session_service.create_session(session_data)
-            return LoginResponse(session_id=session_id, role=user.role)
-        return None
-
-    def logout(self, session_id: str) -> bool:
+        email = email.strip().lower()
+        retry_after = max(
+            self.identity_limiter.acquire(email),
+            self.ip_limiter.acquire(source_ip) if source_ip else 0.0,
+        )
+        if retry_after:
+            raise LoginThrottledError(retry_after)
+
+        found = await self._find_user(email)
+        if not found:
+            return None
+        user_dn, role = found
+        if not await self.ldap_db.run(self.ldap_db.verify_password, user_dn, password):
+            return None
+        user = LDAPUser(email=email, password="", role=role)
+
+        # Create session with user data (excluding password)
+        session_data = SessionData(email=user.email, role=user.role)
+        session_id = await self.session_service.create_session(session_data)
+        return LoginResponse(session_id=session_id, role=user.role)
+
+    async def logout(self, session_id: str) -> bool:
         """Delete the session."""
-        return self.session_service.delete_session(session_id)
+        return await self.session_service.delete_session(session_id)
 
-    def get_current_user(self, session_id: str) -> Optional[SessionData]:
+    async def get_current_user(self, session_id: str) -> Optional[SessionData]:
         """Get user data from session."""
-        return self.session_service.get_session(session_id)
+        return await self.session_service.get_session(session_id)
+
+    def stats(self) -> dict:
+        lookups = self.lookup_cache.hits + self.lookup_cache.misses
+        return {
+            "lookup_cache": {
+                "entries": len(self.lookup_cache.entries),
+                "hits": self.lookup_cache.hits,
+                "misses": self.lookup_cache.misses,
+                "hit_ratio": self.lookup_cache.hits / lookups if lookups else 0.0,
+            },
+            "throttled_identity": self.identity_limiter.rejected,
+            "throttled_ip": self.ip_limiter.rejected,
+            "ldap": self.ldap_db.stats(),
+        }
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `burst` attempts at once, refilled at `rate` per second.
+
+    Only the `max_keys` most recently seen keys are tracked, so a flood of
+    distinct identities can't grow memory without bound.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, key: str) -> float:
+        """Take a token for `key`. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                self.buckets.move_to_end(key)
+                self.rejected += 1
+                return (1 - tokens) / self.rate
+            self.buckets[key] = (tokens - 1, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return 0.0
+
+
+class TTLCache(Generic[V]):
+    """Small bounded cache whose entries expire after a TTL chosen per entry."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, V]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> tuple[bool, Optional[V]]:
+        """Return (found, value); a cached None is a valid, found value."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key: str, value: V, ttl: float):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+from pydantic import TypeAdapter
+from app.database.models import Dish
+from app.database.mongo import AsyncDBClient
+
+dish_list_adapter = TypeAdapter(list[Dish])
+
+
+class DishCatalog:
+    """In-process cache of the dish catalog.
+
+    Holds validated Dish objects keyed by id plus the pre-serialized JSON body
+    of GET /dishes. Entries expire after `ttl` seconds and are dropped early
+    when a `dishes:invalidated` event arrives. Catalogs larger than
+    `max_entries` are served straight from Mongo instead of being cached;
+    for the next `ttl` seconds lookups by id then go to Mongo with a single
+    query rather than loading the whole catalog.
+    """
+
+    def __init__(self, db_client: AsyncDBClient, ttl: float = 300, max_entries: int = 5000):
+        self.db_client = db_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._by_id: Optional[dict[str, Dish]] = None
+        self._body: bytes = b"[]"
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._uncacheable_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _uncacheable(self) -> bool:
+        return time.monotonic() < self._uncacheable_until
+
+    def _is_fresh(self) -> bool:
+        return self._by_id is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _fetch(self) -> tuple[dict[str, Dish], bytes]:
+        docs = await self.db_client.get_dishes()
+        dishes = dish_list_adapter.validate_python(docs)
+        return {dish.id: dish for dish in dishes if dish.id}, dish_list_adapter.dump_json(dishes, by_alias=True)
+
+    async def _load(self) -> tuple[dict[str, Dish], bytes]:
+        if self._is_fresh():
+            self.hits += 1
+            assert self._by_id is not None
+            return self._by_id, self._body
+        if self._uncacheable():
+            # Nothing would be stored, so there is no point queueing on the lock
+            self.misses += 1
+            return await self._fetch()
+
+        async with self._lock:
+            # Another request may have refreshed the catalog while we waited
+            if self._is_fresh():
+                self.hits += 1
+                assert self._by_id is not None
+                return self._by_id, self._body
+
+            self.misses += 1
+            generation = self._generation
+            by_id, body = await self._fetch()
+            if len(by_id) > self.max_entries:
+                logging.warning(f"Dish catalog has {len(by_id)} entries (max {self.max_entries}), not caching it")
+                self._uncacheable_until = time.monotonic() + self.ttl
+                return by_id, body
+            # Don't store a snapshot that was invalidated while it was loading
+            if generation == self._generation:
+                self._by_id, self._body, self._loaded_at = by_id, body, time.monotonic()
+            return by_id, body
+
+    async def get_dishes_json(self) -> bytes:
+        """Return the JSON body of the whole catalog."""
+        _, body = await self._load()
+        return body
+
+    async def get_dish_costs(self, dish_ids: Iterable[str]) -> dict[str, float]:
+        """Return cost_unit per dish id.
+
+        Ids missing from the cached catalog (e.g. a dish added since the last
+        refresh) are looked up in Mongo in a single query, as are all of
+        them while the catalog is too large to cache.
+        """
+        dish_ids = set(dish_ids)
+        if self._uncacheable():
+            return await self.db_client.get_dish_costs(dish_ids)
+        by_id, _ = await self._load()
+        costs = {dish_id: by_id[dish_id].cost_unit for dish_id in dish_ids if dish_id in by_id}
+        missing = dish_ids - costs.keys()
+        if missing:
+            costs.update(await self.db_client.get_dish_costs(missing))
+        return costs
+
+    def invalidate(self):
+        self._generation += 1
+        self._by_id = None
+        self._body = b"[]"
+        # The catalog may have shrunk, find out on the next load
+        self._uncacheable_until = 0.0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._by_id) if self._by_id is not None else 0,
+            "cacheable": not self._uncacheable(),
+            "age_seconds": time.monotonic() - self._loaded_at if self._by_id is not None else None,
+        }
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from app.lib.utils.metrics import metrics
+
+metrics.describe("event_loop_lag_seconds", "histogram", "How late the event loop woke a sleeping task")
+metrics.describe("http_request_seconds", "histogram", "Time from receiving an HTTP request to finishing its response")
+
+
+class LoopLagMonitor:
+    """Samples event loop lag by sleeping `interval` seconds and measuring the overshoot.
+
+    Blocking calls on the loop (synchronous I/O, heavy validation or
+    serialization) show up here as lag, even when no stage timer covers them.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(loop.time() - start - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            metrics.observe("event_loop_lag_seconds", self.last_lag)
+
+    def stats(self) -> dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
+
+
+def _frame_name(code, lineno: Optional[int] = None) -> str:
+    filename = code.co_filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    location = f"{filename}:{lineno}" if lineno is not None else filename
+    return f"{code.co_name} ({location})"
+
+
+class SamplingProfiler:
+    """Statistical profiler for the event loop thread, switched on at runtime.
+
+    While running, a background thread reads the loop thread's current stack
+    every `interval_ms` and counts the innermost frame (self time) and every
+    function on the stack (total time). Nothing is hooked into the
+    interpreter, so it costs nothing while stopped and little while running.
+    When a run ends the hottest frames are logged; report() returns them.
+    """
+
+    def __init__(self, interval_ms: float = 5, top: int = 25):
+        self.interval = interval_ms / 1000
+        self.top = top
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.self_counts: Counter[str] = Counter()
+        self.total_counts: Counter[str] = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: float) -> bool:
+        """Profile the calling thread, normally the event loop, for `seconds`. False if already running."""
+        if self.running:
+            return False
+        self.self_counts.clear()
+        self.total_counts.clear()
+        self.samples = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.stopping.clear()
+        self.thread = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), seconds),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stopping.set()
+
+    def _sample(self, thread_id: int, seconds: float):
+        start = time.monotonic()
+        deadline = start + seconds
+        while time.monotonic() < deadline and not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            self.samples += 1
+            self.self_counts[_frame_name(frame.f_code, frame.f_lineno)] += 1
+            seen = set()
+            while frame is not None:
+                name = _frame_name(frame.f_code)
+                if name not in seen:
+                    seen.add(name)
+                    self.total_counts[name] += 1
+                frame = frame.f_back
+        self.duration = time.monotonic() - start
+        logging.info(
+            f"Profiled the event loop for {self.duration:.1f}s ({self.samples} samples), hottest frames: "
+            + "; ".join(f"{name} {count}" for name, count in self.self_counts.most_common(10))
+        )
+
+    def report(self, limit: Optional[int] = None) -> dict:
+        limit = limit or self.top
+        samples = self.samples or 1
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "self": [
+                {"frame": name, "samples": count, "percent": round(count / samples * 100, 1)}
+                for name, count in self.self_counts.most_common(limit)
+            ],
+            "total": [
+                {"function": name, "samples": count, "percent": round(count / samples * 100, 1)}
+                for name, count in self.total_counts.most_common(limit)
+            ],
+        }
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware recording each HTTP request's duration by route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template keeps label cardinality bounded, /orders/{order_id}/status not each id
+            route = scope.get("route")
+            metrics.observe(
+                "http_request_seconds",
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class StartupStep:
+    def __init__(self, name: str, run: Callable[[], Awaitable[None]], required: bool):
+        self.name = name
+        self.run = run
+        self.required = required
+        self.ready = False
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.ready_after_ms: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class StartupTasks:
+    """Brings up dependencies concurrently in the background and tracks readiness.
+
+    The app starts serving as soon as start() returns; every step runs in its
+    own task and is retried with exponential backoff until it succeeds. The
+    app is ready once all required steps are. Optional steps (warming a
+    connection pool, say) are reported but don't hold readiness back.
+    """
+
+    def __init__(self, retry_interval: float = 1.0, max_retry_interval: float = 30.0):
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.steps: list[StartupStep] = []
+        self.started = 0.0
+
+    def add(self, name: str, run: Callable[[], Awaitable[None]], required: bool = True):
+        self.steps.append(StartupStep(name, run, required))
+
+    async def start(self):
+        self.started = time.monotonic()
+        for step in self.steps:
+            step.task = asyncio.create_task(self._run(step))
+
+    async def _run(self, step: StartupStep):
+        delay = self.retry_interval
+        while True:
+            step.attempts += 1
+            try:
+                await step.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                step.error = str(e) or type(e).__name__
+                logging.warning(f"Startup step {step.name} failed (attempt {step.attempts}), retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+            step.ready = True
+            step.error = None
+            step.ready_after_ms = (time.monotonic() - self.started) * 1000
+            return
+
+    async def stop(self):
+        for step in self.steps:
+            if step.task and not step.task.done():
+                step.task.cancel()
+
+    @property
+    def ready(self) -> bool:
+        return all(step.ready for step in self.steps if step.required)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.started, 3) if self.started else 0.0,
+            "steps": {
+                step.name: {
+                    "ready": step.ready,
+                    "required": step.required,
+                    "attempts": step.attempts,
+                    "error": step.error,
+                    "ready_after_ms": round(step.ready_after_ms, 1) if step.ready_after_ms is not None else None,
+                }
+                for step in self.steps
+            },
+        }
@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import logging
+from typing import Any, Callable, Coroutine, Optional
+from app.services.pubsub.channels import CHANNELS, Channels
+from app.services.pubsub.rabbit import JSON_CONTENT_TYPE, Codec, decode_message
+
+# In-process stand-ins for Mongo, Redis, RabbitMQ and LDAP, used when
+# APP_BACKEND=memory so the API can be run and load tested without the
+# docker-compose stack. Mongo and Redis come from mongomock and fakeredis,
+# which are only needed for this:
+#
+#   pip install mongomock fakeredis
+
+USER_ROLES = ("admin", "register", "kitchen")
+
+
+def memory_mongo_client(db_name: str, seed_dishes: int = 20):
+    """A mongomock client with `seed_dishes` dishes in `db_name`'s catalog."""
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.9 passes `sort` for UpdateOne and ReplaceOne, which mongomock doesn't know
+    for method in ("add_update", "add_replace"):
+        add = getattr(BulkOperationBuilder, method)
+        if not getattr(add, "accepts_sort", False):
+            def add_with_sort(self, *args, sort=None, _add=add, **kwargs):
+                return _add(self, *args, **kwargs)
+            add_with_sort.accepts_sort = True  # type: ignore[attr-defined]
+            setattr(BulkOperationBuilder, method, add_with_sort)
+
+    client = mongomock.MongoClient()
+    if seed_dishes:
+        client[db_name]["dishes"].insert_many([
+            {"title": f"Dish {i}", "description": None, "cost_unit": 5.0 + i % 10, "extras": None}
+            for i in range(seed_dishes)
+        ])
+    return client
+
+
+def memory_redis_client():
+    """A fakeredis client that behaves like redis.asyncio.Redis."""
+    import fakeredis
+
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+class InMemoryPubSubService:
+    """Stands in for RabbitPubSubService within a single process.
+
+    Each channel is an asyncio queue drained by one consumer task, so pub()
+    returns before subscribers run, as it would with a broker. Messages go
+    through the same codec as the real service. Several subscribers on one
+    channel take turns, like consumers on a shared work queue.
+    """
+
+    def __init__(self, codec: Optional[Codec] = None):
+        self.codec = codec or Codec()
+        self.mode = "memory"
+        self.publisher = None
+        self.queues: dict[str, asyncio.Queue[bytes]] = {}
+        self.subscribers: dict[str, list[tuple[Callable[..., Coroutine], bool]]] = {}
+        self.consumers: list[asyncio.Task] = []
+        self.published = 0
+
+    async def connect(self):
+        for queue_name in CHANNELS:
+            self.queues.setdefault(queue_name, asyncio.Queue())
+        print("Using in-memory pub/sub")
+
+    async def sub(self, queue_name: Channels, callback: Callable[..., Coroutine], raw: bool = False):
+        queue = self.queues.setdefault(queue_name, asyncio.Queue())
+        if queue_name not in self.subscribers:
+            self.subscribers[queue_name] = []
+            self.consumers.append(asyncio.create_task(self._consume(queue_name, queue)))
+        self.subscribers[queue_name].append((callback, raw))
+
+    async def _consume(self, queue_name: str, queue: asyncio.Queue[bytes]):
+        turns = itertools.count()
+        while True:
+            body = await queue.get()
+            subscribers = self.subscribers[queue_name]
+            callback, raw = subscribers[next(turns) % len(subscribers)]
+            try:
+                data = decode_message(body, self.codec.content_type)
+                if raw:
+                    await callback(data, body if self.codec.content_type == JSON_CONTENT_TYPE else None)
+                else:
+                    await callback(data)
+            except Exception as e:
+                logging.error(f"Error handling in-memory message on {queue_name}: {e}")
+
+    async def pub(self, queue_name: Channels, message: dict | list[dict], confirm: bool = False):
+        self.queues.setdefault(queue_name, asyncio.Queue()).put_nowait(self.codec.encode(message))
+        self.published += 1
+
+    async def close(self):
+        for consumer in self.consumers:
+            consumer.cancel()
+        self.consumers.clear()
+
+
+class StubLDAPDatabase:
+    """Stands in for LDAPDatabase.
+
+    Every email whose local part starts with a role name (e.g.
+    register3@example.org, kitchen@example.org) exists with that role and
+    the shared `password`; any other email is unknown.
+    """
+
+    def __init__(self, password: str = "bench"):
+        self.password = password
+        self.lookups = 0
+        self.binds = 0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        return fn(*args)
+
+    def warm_up(self):
+        pass
+
+    def find_user(self, email: str) -> Optional[tuple[str, str]]:
+        self.lookups += 1
+        local_part = email.split("@", 1)[0]
+        for role in USER_ROLES:
+            if local_part.startswith(role):
+                return f"mail={email},ou=users,dc=example,dc=org", role
+        return None
+
+    def verify_password(self, user_dn: str, password: str) -> bool:
+        self.binds += 1
+        return bool(password) and password == self.password
+
+    def stats(self) -> dict:
+        return {"stub": True, "lookups": self.lookups, "binds": self.binds}
+
+    def close(self):
+        pass
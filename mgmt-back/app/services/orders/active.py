@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, get_args
+from app.database.models import Order, OrderStatus, OrderType
+from app.database.mongo import AsyncDBClient
+from app.lib.utils.dates import to_naive_utc
+
+ACTIVE_STATUSES: tuple[OrderStatus, ...] = ("preparing", "done")
+
+
+def _version(order: Order):
+    return order.updated_at or order.created_at
+
+
+class ActiveOrdersView:
+    """Process-local materialized view of the orders kitchen screens care about.
+
+    Loaded from Mongo at startup and kept current by the same orders:new and
+    orders:updated events the WebSocket fan-out consumes. Delivered orders
+    are evicted. A periodic reconcile reloads the view from Mongo to repair
+    anything a missed event left behind.
+    """
+
+    def __init__(self, db_client: AsyncDBClient, reconcile_interval: float = 60, max_tombstones: int = 10000):
+        self.db_client = db_client
+        self.reconcile_interval = reconcile_interval
+        self.orders: dict[str, Order] = {}
+        # Recently evicted orders, so a late event can't bring one back
+        self.tombstones: OrderedDict[str, Order] = OrderedDict()
+        self.max_tombstones = max_tombstones
+        self.ready = False
+        self.task: Optional[asyncio.Task] = None
+        # Events seen while a reconcile is loading, replayed over its snapshot
+        self._replay: Optional[dict[str, Order]] = None
+        self.events = 0
+        self.reconciles = 0
+        self.last_drift = 0
+        self.last_reconcile_ms = 0.0
+
+    def _merge(self, orders: dict[str, Order], order: Order):
+        assert order.id is not None
+        current = orders.get(order.id) or self.tombstones.get(order.id)
+        # Events can arrive out of order, never go back to an older state
+        if current is not None and _version(current) > _version(order):
+            return
+        if order.status in ACTIVE_STATUSES:
+            orders[order.id] = order
+            self.tombstones.pop(order.id, None)
+        else:
+            orders.pop(order.id, None)
+            self.tombstones[order.id] = order
+            self.tombstones.move_to_end(order.id)
+            while len(self.tombstones) > self.max_tombstones:
+                self.tombstones.popitem(last=False)
+
+    def apply(self, event: dict | Order):
+        order = event if isinstance(event, Order) else Order.model_validate(event, by_alias=True)
+        if order.id is None:
+            return
+        # The deliveries backend publishes timezone-aware dates, Mongo gives back naive
+        # UTC ones; mixing both would break _version comparisons and query() sorting
+        order = order.model_copy(update={
+            "created_at": to_naive_utc(order.created_at),
+            "updated_at": to_naive_utc(order.updated_at) if order.updated_at else None,
+        })
+        self.events += 1
+        self._merge(self.orders, order)
+        if self._replay is not None:
+            self._replay[order.id] = order
+
+    async def reconcile(self):
+        start = time.perf_counter()
+        self._replay = {}
+        try:
+            snapshot: dict[str, Order] = {}
+            for status in ACTIVE_STATUSES:
+                for doc in await self.db_client.get_orders(status=status):
+                    order = Order.model_validate(doc, by_alias=True)
+                    assert order.id is not None
+                    snapshot[order.id] = order
+            replay = self._replay
+        finally:
+            self._replay = None
+        for order in replay.values():
+            self._merge(snapshot, order)
+
+        if self.ready:
+            # Orders missing on either side or stuck in another status
+            self.last_drift = sum(
+                1 for order_id in snapshot.keys() | self.orders.keys()
+                if order_id not in snapshot or order_id not in self.orders
+                or snapshot[order_id].status != self.orders[order_id].status
+            )
+            if self.last_drift:
+                logging.warning(f"Active orders view was off by {self.last_drift} orders, reconciled")
+        self.orders = snapshot
+        self.ready = True
+        self.reconciles += 1
+        self.last_reconcile_ms = (time.perf_counter() - start) * 1000
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logging.warning(f"Active orders reconcile failed: {e}")
+
+    async def start(self):
+        await self.reconcile()
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def serves(self, status: Optional[OrderStatus]) -> bool:
+        return self.ready and status in ACTIVE_STATUSES
+
+    def query(self, status: OrderStatus, type: Optional[OrderType] = None) -> list[Order]:
+        orders = [
+            order for order in self.orders.values()
+            if order.status == status and (type is None or order.type == type)
+        ]
+        orders.sort(key=lambda order: (order.created_at, order.id or ""))
+        return orders
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "orders": len(self.orders),
+            "by_status": {
+                status: sum(1 for order in self.orders.values() if order.status == status)
+                for status in ACTIVE_STATUSES
+            },
+            "by_type": {
+                type: sum(1 for order in self.orders.values() if order.type == type)
+                for type in get_args(OrderType)
+            },
+            "events": self.events,
+            "reconciles": self.reconciles,
+            "last_drift": self.last_drift,
+            "last_reconcile_ms": round(self.last_reconcile_ms, 1),
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+import bson
+from pydantic import ValidationError
+from app.database.models import Order
+from app.database.mongo import OUTBOX_FIELD, AsyncDBClient
+from app.lib.utils.metrics import metrics
+from app.services.pubsub.rabbit import RabbitPubSubService
+
+
+class OutboxRelay:
+    """Publishes the order events DBClient leaves in order outboxes.
+
+    Requests only write to Mongo and call notify(); this task then reads the
+    pending events in batches, publishes each order's current state once per
+    channel and removes the events after the broker has confirmed them.
+    Delivery is at least once: if the process dies between the confirm and
+    the ack the events are published again, which consumers tolerate since
+    every event carries the full order state.
+
+    Besides being woken, it polls every `poll_interval` seconds and sweeps
+    events older than `overdue_after` seconds that another instance left.
+    """
+
+    def __init__(
+        self,
+        db_client: AsyncDBClient,
+        pubsub: RabbitPubSubService,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        overdue_after: float = 30.0,
+        retry_interval: float = 1.0,
+    ):
+        self.db_client = db_client
+        self.pubsub = pubsub
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.overdue_after = overdue_after
+        self.retry_interval = retry_interval
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.last_sweep = 0.0
+        self.published = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_lag_ms = 0.0
+        self.avg_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_batch_ms = 0.0
+
+    def notify(self):
+        """Wake the relay after writing an order, so the event goes out right away."""
+        self.wakeup.set()
+
+    async def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        # Anything still pending stays in the outbox for the next start
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                # Cleared before reading, so a write that lands during the batch wakes the next round
+                self.wakeup.clear()
+                relayed = await self.relay_batch()
+                if time.monotonic() - self.last_sweep >= self.overdue_after:
+                    self.last_sweep = time.monotonic()
+                    await self.relay_batch(self.overdue_after)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logging.warning(f"Outbox relay failed, retrying in {self.retry_interval}s: {e}")
+                await asyncio.sleep(self.retry_interval)
+                continue
+            if relayed == self.batch_size:
+                # More may be waiting, don't sleep
+                continue
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def relay_batch(self, overdue_after: Optional[float] = None) -> int:
+        """Publish and acknowledge one batch of pending events. Returns the number of orders relayed."""
+        docs = await self.db_client.fetch_outbox(self.batch_size, overdue_after)
+        if not docs:
+            return 0
+
+        start = time.perf_counter()
+        events: dict[str, list[dict]] = {}
+        delivered: dict[str, list[bson.ObjectId]] = {}
+        oldest: Optional[datetime] = None
+        for doc in docs:
+            pending = doc.pop(OUTBOX_FIELD, [])
+            delivered[doc["_id"]] = [event["event_id"] for event in pending]
+            try:
+                order = Order.model_validate(doc, by_alias=True).model_dump(mode='json', by_alias=True)
+            except ValidationError as e:
+                # Retrying can't fix the document, drop its events rather than block the outbox
+                logging.error(f"Dropping outbox events of invalid order {doc['_id']}: {e}")
+                continue
+            for channel in dict.fromkeys(event["channel"] for event in pending):
+                events.setdefault(channel, []).append(order)
+            for event in pending:
+                oldest = event["at"] if oldest is None else min(oldest, event["at"])
+
+        for channel, orders in events.items():
+            await self.pubsub.pub(channel, orders[0] if len(orders) == 1 else orders, confirm=True)  # type: ignore[arg-type]
+        await self.db_client.ack_outbox(delivered)
+
+        self.batches += 1
+        self.published += sum(len(orders) for orders in events.values())
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        metrics.observe_stage("outbox_relay", self.last_batch_ms / 1000)
+        if oldest is not None:
+            # Time from the order write to its event being confirmed by the broker
+            self.last_lag_ms = max((datetime.now() - oldest).total_seconds() * 1000, 0.0)
+            self.avg_lag_ms = self.last_lag_ms if self.batches == 1 else 0.9 * self.avg_lag_ms + 0.1 * self.last_lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+        return len(docs)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.task is not None,
+            "events_published": self.published,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "avg_lag_ms": round(self.avg_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+        }
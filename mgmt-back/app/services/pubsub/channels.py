@@ -1,5 +1,7 @@
 from typing import Literal
 
 
-CHANNELS = ["orders:new", "orders:updated"]
-type Channels = Literal["orders:new", "orders:updated"]
\ No newline at end of file
+CHANNELS = ["orders:new", "orders:updated", "dishes:invalidated"]
+type Channels = Literal["orders:new", "orders:updated", "dishes:invalidated"]
+# Every process must see these whatever the delivery mode, e.g. to drop its cache
+BROADCAST_CHANNELS = ["dishes:invalidated"]
@@ -0,0 +1,191 @@
+import aio_pika
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+from app.lib.utils.metrics import metrics
+from .rabbit import Codec
+
+
+# Resolves, for one pooled channel, the exchange and routing key of a queue name
+TargetResolver = Callable[[aio_pika.abc.AbstractChannel, str], Awaitable[tuple[aio_pika.abc.AbstractExchange, str]]]
+
+
+class RabbitPublisher:
+    """Background publisher with a channel pool and publisher confirms.
+
+    pub() only puts the event in a bounded local buffer, so a request never
+    waits on the broker unless the buffer is full. One worker per pooled
+    channel drains the buffer; with a `linger_ms` window it waits that long
+    for more events on the same channel and sends them as a single message
+    whose body is the list of events. Each worker keeps several publishes in
+    flight and awaits their confirms together.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        linger_ms: float = 0,
+        max_batch: int = 50,
+        buffer_size: int = 1000,
+        persistent: bool = True,
+        retry_interval: float = 1.0,
+    ):
+        self.pool_size = pool_size
+        self.linger = linger_ms / 1000
+        self.max_batch = max_batch
+        self.persistent = persistent
+        self.retry_interval = retry_interval
+        self.buffer: asyncio.Queue[tuple[str, dict | list[dict], Optional[asyncio.Future]]] = asyncio.Queue(maxsize=buffer_size)
+        self.workers: list[asyncio.Task] = []
+        self.codec = Codec()
+        self.published = 0
+        self.messages = 0
+        self.failures = 0
+        self.last_confirm_ms = 0.0
+        self.avg_confirm_ms = 0.0
+        self.max_confirm_ms = 0.0
+
+    async def start(
+        self,
+        connection: aio_pika.abc.AbstractRobustConnection,
+        resolve_target: TargetResolver,
+        codec: Optional[Codec] = None,
+    ):
+        if codec:
+            self.codec = codec
+        for _ in range(self.pool_size):
+            channel = await connection.channel(publisher_confirms=True)
+            self.workers.append(asyncio.create_task(self._work(channel, resolve_target)))
+
+    async def pub(self, queue_name: str, message: dict | list[dict], confirm: bool = False):
+        """Buffer an event for publishing. Only waits when the buffer is full.
+
+        With `confirm`, also waits until the broker has confirmed it.
+        """
+        confirmed = asyncio.get_running_loop().create_future() if confirm else None
+        await self.buffer.put((queue_name, message, confirmed))
+        if confirmed:
+            await confirmed
+
+    async def _next_batch(self) -> tuple[dict[str, list[dict]], list[Optional[asyncio.Future]]]:
+        """Take one event, then whatever else arrives within the linger window.
+
+        Returns the events grouped by queue name and the confirm futures of
+        the buffer entries taken, one per entry.
+        """
+        batch: dict[str, list[dict]] = {}
+        taken: list[Optional[asyncio.Future]] = []
+
+        def add(queue_name: str, message: dict | list[dict], confirmed: Optional[asyncio.Future]):
+            events = message if isinstance(message, list) else [message]
+            batch.setdefault(queue_name, []).extend(events)
+            taken.append(confirmed)
+
+        add(*await self.buffer.get())
+        if self.linger <= 0:
+            return batch, taken
+        deadline = time.monotonic() + self.linger
+        while len(taken) < self.max_batch:
+            if not self.buffer.empty():
+                add(*self.buffer.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                add(*await asyncio.wait_for(self.buffer.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch, taken
+
+    async def _confirm(self, exchange: aio_pika.abc.AbstractExchange, routing_key: str, events: list[dict]):
+        # A batch of one is sent as the bare event so single events look as before
+        body = self.codec.encode(events[0] if len(events) == 1 else events)
+        message = aio_pika.Message(
+            body=body,
+            content_type=self.codec.content_type,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT if self.persistent else None,
+        )
+        start = time.perf_counter()
+        while True:
+            try:
+                await exchange.publish(message, routing_key=routing_key)
+                break
+            except Exception as e:
+                # Keep the events until the broker confirms them
+                self.failures += 1
+                logging.warning(f"Publish to {routing_key} failed, retrying in {self.retry_interval}s: {e}")
+                await asyncio.sleep(self.retry_interval)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe_stage("rabbit_publish", elapsed_ms / 1000, queue=routing_key)
+        self.last_confirm_ms = elapsed_ms
+        self.avg_confirm_ms = elapsed_ms if not self.messages else 0.9 * self.avg_confirm_ms + 0.1 * elapsed_ms
+        self.max_confirm_ms = max(self.max_confirm_ms, elapsed_ms)
+        self.messages += 1
+        self.published += len(events)
+
+    async def _work(self, channel: aio_pika.abc.AbstractChannel, resolve_target: TargetResolver):
+        targets: dict[str, tuple[aio_pika.abc.AbstractExchange, str]] = {}
+        while True:
+            batch, taken = await self._next_batch()
+            error: Optional[BaseException] = None
+            try:
+                confirms = []
+                for queue_name, events in batch.items():
+                    if queue_name not in targets:
+                        targets[queue_name] = await resolve_target(channel, queue_name)
+                    exchange, routing_key = targets[queue_name]
+                    for start in range(0, len(events), self.max_batch):
+                        confirms.append(self._confirm(exchange, routing_key, events[start:start + self.max_batch]))
+                # Let every publish finish before reporting, so none is left running unseen
+                results = await asyncio.gather(*confirms, return_exceptions=True)
+                error = next((result for result in results if isinstance(result, BaseException)), None)
+            except asyncio.CancelledError as e:
+                error = e
+                raise
+            except Exception as e:
+                error = e
+            finally:
+                if error is not None and not isinstance(error, asyncio.CancelledError):
+                    # Resolving or encoding failed; the worker carries on with the next batch
+                    self.failures += 1
+                    targets.clear()
+                    logging.error(f"Dropping a batch of {len(taken)} events to {', '.join(batch)}: {error!r}")
+                for confirmed in taken:
+                    if confirmed and not confirmed.done():
+                        if isinstance(error, asyncio.CancelledError):
+                            confirmed.cancel()
+                        elif error is not None:
+                            # confirm=True callers (the outbox relay) keep their events and retry
+                            confirmed.set_exception(error)
+                        else:
+                            confirmed.set_result(None)
+                    self.buffer.task_done()
+
+    async def flush(self, timeout: float = 5.0):
+        """Wait for buffered events to be handed to the broker."""
+        try:
+            await asyncio.wait_for(self.buffer.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self.buffer.qsize()} events still buffered after {timeout}s")
+
+    async def close(self):
+        await self.flush()
+        for worker in self.workers:
+            worker.cancel()
+        self.workers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self.workers),
+            "buffered": self.buffer.qsize(),
+            "buffer_size": self.buffer.maxsize,
+            "events_published": self.published,
+            "messages_published": self.messages,
+            "failures": self.failures,
+            "last_confirm_ms": round(self.last_confirm_ms, 3),
+            "avg_confirm_ms": round(self.avg_confirm_ms, 3),
+            "max_confirm_ms": round(self.max_confirm_ms, 3),
+        }
+
@@ -1,29 +1,142 @@
 import aio_pika
 import asyncio
 import os
-from typing import Callable, Coroutine, Any
+from typing import TYPE_CHECKING, Callable, Coroutine, Literal, Optional
 import json
-from .channels import CHANNELS, Channels
+from .channels import BROADCAST_CHANNELS, CHANNELS, Channels
 
-def serialize_json(message: dict) -> bytes:
-    return json.dumps(message).encode('utf-8')
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
 
-def deserialize_json(body: bytes) -> dict:
-    return json.loads(body.decode('utf-8'))
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+if TYPE_CHECKING:
+    from .publisher import RabbitPublisher
+
+# work: every channel is a shared durable queue, each message reaches one consumer
+# broadcast: every channel is a fanout exchange, each process gets its own copy
+DeliveryMode = Literal["work", "broadcast"]
+
+class Codec:
+    """Wire format of pub/sub messages, announced in the AMQP content type."""
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, message: dict | list[dict]) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(message)
+        return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, body: bytes) -> dict | list[dict]:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body.decode('utf-8'))
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("The msgpack codec needs the msgpack package installed")
+
+    def encode(self, message: dict | list[dict]) -> bytes:
+        return msgpack.packb(message)
+
+    def decode(self, body: bytes) -> dict | list[dict]:
+        return msgpack.unpackb(body)
+
+
+CODECS: dict[str, type[Codec]] = {Codec.name: Codec, MsgpackCodec.name: MsgpackCodec}
+JSON_CONTENT_TYPE = Codec.content_type
+
+def get_codec(name: str) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown pub/sub codec: {name}")
+    return CODECS[name]()
+
+def decode_message(body: bytes, content_type: Optional[str]) -> dict | list[dict]:
+    """Decode a message in whichever format its publisher used.
+
+    Messages without a content type (older instances, the deliveries backend)
+    are JSON.
+    """
+    if content_type == MsgpackCodec.content_type:
+        return MsgpackCodec().decode(body)
+    return Codec().decode(body)
+
+def exchange_name(queue_name: Channels) -> str:
+    return f"{queue_name}:broadcast"
 
 class RabbitPubSubService:
-    def __init__(self, host: str, port: int, user: str, password: str):
+    """Publish/subscribe over RabbitMQ.
+
+    In "work" mode (the default) channels are durable queues shared by all
+    consumers, so RabbitMQ round-robins messages between replicas. In
+    "broadcast" mode each channel is a fanout exchange and every process
+    consumes from its own exclusive auto-delete queue, so all replicas see
+    every event. Broadcast subscribers also drain the durable queue and
+    forward it to the exchange, so producers still publishing straight to the
+    queue (the deliveries backend) keep reaching every replica. Channels in
+    BROADCAST_CHANNELS, such as cache invalidations, are broadcast in either
+    mode.
+
+    With a `publisher`, pub() hands events to its buffer and pooled channels
+    instead of publishing inline on the shared channel.
+
+    Messages are encoded with `codec` and carry its content type; consumers
+    decode by content type, so instances on different codecs interoperate.
+    Subscribers can ask for the raw body of JSON messages to pass it on
+    without encoding it again.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        mode: DeliveryMode = "work",
+        publisher: Optional["RabbitPublisher"] = None,
+        codec: Optional[Codec] = None,
+        connect_timeout: float = 10.0,
+    ):
+        if mode not in ("work", "broadcast"):
+            raise ValueError(f"Unknown delivery mode: {mode}")
         self.rabbitmq_url = f"amqp://{user}:{password}@{host}:{port}/"
+        self.mode = mode
         self.connection = None
         self.channel = None
+        self.exchanges: dict[str, aio_pika.abc.AbstractExchange] = {}
+        self.bridged: set[str] = set()
+        # Consumer tag per subscribed channel, so a retried startup doesn't consume twice
+        self.consumers: dict[str, str] = {}
+        self.publisher = publisher
+        self.codec = codec or Codec()
+        # Startup connects in the background; a pub() racing it waits instead of connecting twice
+        self.connect_lock = asyncio.Lock()
+        # Per connection attempt, and how long pub() waits for a connection before failing
+        self.connect_timeout = connect_timeout
 
     async def connect(self, retries: int | None = None, interval: float | None = None):
         """Connect to RabbitMQ and declare queues.
 
         This method will retry a few times (configurable) before raising so
         that the app can tolerate RabbitMQ starting a bit slower than this
-        service.
+        service. Does nothing if already connected.
         """
+        async with self.connect_lock:
+            if self.channel:
+                return
+            await self._connect(retries, interval)
+
+    async def _connect(self, retries: int | None, interval: float | None):
         # Allow configuration via env vars; defaults: 10 attempts, 3s interval
         if retries is None:
             try:
@@ -41,13 +154,27 @@ class RabbitPubSubService:
         while True:
             try:
                 attempt += 1
-                self.connection = await aio_pika.connect_robust(self.rabbitmq_url)
-                self.channel = await self.connection.channel()
+                self.connection = await aio_pika.connect_robust(self.rabbitmq_url, timeout=self.connect_timeout)
+                channel = await self.connection.channel()
                 for queue_name in CHANNELS:
-                    await self.channel.declare_queue(queue_name, durable=True)
+                    await channel.declare_queue(queue_name, durable=True)
+                    if self._broadcasts(queue_name):
+                        self.exchanges[queue_name] = await channel.declare_exchange(
+                            exchange_name(queue_name), aio_pika.ExchangeType.FANOUT, durable=True
+                        )
+                if self.publisher and not self.publisher.workers:
+                    await self.publisher.start(self.connection, self._resolve_target, self.codec)
+                # Set last, so a failed attempt doesn't count as connected
+                self.channel = channel
                 print("Connected to RabbitMQ")
                 return
-            except Exception as exc:
+            except BaseException as exc:
+                # Don't leave a half set up connection reconnecting in the background
+                if self.connection:
+                    await asyncio.shield(self.connection.close())
+                    self.connection = None
+                if not isinstance(exc, Exception):
+                    raise
                 last_exc = exc
                 if attempt >= retries:
                     print(f"Failed to connect to RabbitMQ after {attempt} attempts: {exc}")
@@ -55,32 +182,103 @@ class RabbitPubSubService:
                 print(f"RabbitMQ not ready (attempt {attempt}/{retries}), retrying in {interval}s...")
                 await asyncio.sleep(interval)
 
-    async def sub(self, queue_name: Channels, callback: Callable[[Any], Coroutine]):
-        """Subscribe to a queue and process messages with the given async callback."""
+    def _broadcasts(self, queue_name: str) -> bool:
+        return self.mode == "broadcast" or queue_name in BROADCAST_CHANNELS
+
+    async def _ensure_connected(self):
+        """Connect if needed, waiting at most `connect_timeout` for it."""
         if not self.channel:
-            await self.connect()
+            await asyncio.wait_for(self.connect(retries=1), self.connect_timeout)
+        assert self.channel is not None
+
+    async def sub(self, queue_name: Channels, callback: Callable[..., Coroutine], raw: bool = False):
+        """Subscribe to a queue and process messages with the given async callback.
+
+        With `raw`, the callback also gets the message body when it is JSON,
+        else None. A channel is consumed once: subscribing to it again does
+        nothing.
+        """
+        if queue_name in self.consumers:
+            return
+        await self._ensure_connected()
         assert self.channel is not None
-        queue = await self.channel.declare_queue(queue_name, durable=True)
+        if self._broadcasts(queue_name):
+            queue = await self._declare_instance_queue(queue_name)
+        else:
+            queue = await self.channel.declare_queue(queue_name, durable=True)
         
         async def on_message(message: aio_pika.abc.AbstractIncomingMessage):
             async with message.process():
-                data = deserialize_json(message.body)
-                await callback(data)
+                data = decode_message(message.body, message.content_type)
+                if not raw:
+                    await callback(data)
+                    return
+                is_json = message.content_type in (None, JSON_CONTENT_TYPE)
+                await callback(data, message.body if is_json else None)
 
-        await queue.consume(on_message)
-        print(f"Subscribed to {queue_name}")
+        self.consumers[queue_name] = await queue.consume(on_message)
+        print(f"Subscribed to {queue_name} ({'broadcast' if self._broadcasts(queue_name) else 'work'})")
 
-    async def pub(self, queue_name: Channels, message: dict):
-        """Publish a message to a queue."""
-        if not self.channel:
-            await self.connect()
+    async def _declare_instance_queue(self, queue_name: Channels) -> aio_pika.abc.AbstractQueue:
+        """Declare this process' private queue on the channel's fanout exchange."""
         assert self.channel is not None
-        body = serialize_json(message)
+        exchange = self.exchanges[queue_name]
+        queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(exchange)
+
+        if queue_name not in self.bridged:
+            legacy_queue = await self.channel.declare_queue(queue_name, durable=True)
+
+            async def forward(message: aio_pika.abc.AbstractIncomingMessage):
+                async with message.process():
+                    await exchange.publish(
+                        aio_pika.Message(body=message.body, content_type=message.content_type), routing_key=""
+                    )
+
+            await legacy_queue.consume(forward)
+            self.bridged.add(queue_name)
+        return queue
+
+    async def _resolve_target(
+        self, channel: aio_pika.abc.AbstractChannel, queue_name: str
+    ) -> tuple[aio_pika.abc.AbstractExchange, str]:
+        """Exchange and routing key a channel publishes a queue name to."""
+        if self._broadcasts(queue_name):
+            return await channel.get_exchange(exchange_name(queue_name)), ""  # type: ignore[arg-type]
+        return channel.default_exchange, queue_name
+
+    async def pub(self, queue_name: Channels, message: dict | list[dict], confirm: bool = False):
+        """Publish a message to a queue.
+
+        A list publishes a batch of events as a single message. With
+        `confirm`, returns only once the broker has confirmed the message,
+        even when it goes through the publisher's buffer.
+        """
+        await self._ensure_connected()
+        assert self.channel is not None
+        if self.publisher:
+            await self.publisher.pub(queue_name, message, confirm)
+            return
+        body = self.codec.encode(message)
+        if self._broadcasts(queue_name):
+            # Instance queues are transient, persisting the message buys nothing
+            await self.exchanges[queue_name].publish(
+                aio_pika.Message(body=body, content_type=self.codec.content_type), routing_key=""
+            )
+            return
         await self.channel.default_exchange.publish(
             aio_pika.Message(
                 body=body,
+                content_type=self.codec.content_type,
                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT
             ),
             routing_key=queue_name
         )
-        
+
+    async def close(self):
+        """Flush pending publishes and close the connection."""
+        if self.publisher:
+            await self.publisher.close()
+        if self.connection:
+            await self.connection.close()
+        print("RabbitMQ connection closed")
@@ -1,41 +1,136 @@
-import redis
+import redis.asyncio as redis
+import asyncio
 import json
+import logging
+import time
 import uuid
 import os
-from typing import Optional, Dict, Any, cast
+from collections import OrderedDict
+from typing import Optional, cast
 from app.lib.types.http import SessionData
+from app.lib.utils.metrics import metrics
+from .cache import SessionCache
+
+# Deleted session ids are announced here so every instance drops its cached copy
+INVALIDATION_CHANNEL = "session:invalidated"
 
 
 class SessionService:
-    def __init__(self):
-        host = os.getenv('REDIS_HOST', 'redis')
-        port = int(os.getenv('REDIS_PORT', 6379))
-        password = os.getenv('REDIS_PASSWORD')
-        db = int(os.getenv('REDIS_DB', 0))
-        self.redis = redis.Redis(host=host, port=port, password=password, db=db, decode_responses=True)
-
-    def create_session(self, data: SessionData, ttl: int = 3600) -> str:
+    """Redis-backed sessions with sliding expiry.
+
+    Every lookup that reaches Redis reads and extends the session in a single
+    GETEX. Refreshes are coalesced: a session is touched at most once per
+    `touch_interval` seconds, cache hits in between cost no round trip.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None):
+        """`client` replaces the Redis connection, e.g. with an in-memory stand-in."""
+        if client is None:
+            host = os.getenv('REDIS_HOST', 'redis')
+            port = int(os.getenv('REDIS_PORT', 6379))
+            password = os.getenv('REDIS_PASSWORD')
+            db = int(os.getenv('REDIS_DB', 0))
+            pool = redis.ConnectionPool(
+                host=host,
+                port=port,
+                password=password,
+                db=db,
+                decode_responses=True,
+                max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+                socket_timeout=float(os.getenv('REDIS_SOCKET_TIMEOUT', 5)),
+            )
+            client = redis.Redis(connection_pool=pool)
+        self.redis = client
+        self.pool = client.connection_pool
+        self.ttl = int(os.getenv('SESSION_TTL', 3600))
+        self.touch_interval = float(os.getenv('SESSION_TOUCH_INTERVAL', 60))
+        self.cache = SessionCache(
+            max_entries=int(os.getenv('SESSION_CACHE_SIZE', 1000)),
+            ttl=float(os.getenv('SESSION_CACHE_TTL', 30)),
+        )
+        self.touched: OrderedDict[str, float] = OrderedDict()
+        self.listener: Optional[asyncio.Task] = None
+
+    def start_invalidation_listener(self):
+        """Drop cached sessions deleted by other instances."""
+        if not self.listener:
+            self.listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def stop_invalidation_listener(self):
+        if self.listener:
+            self.listener.cancel()
+            self.listener = None
+        await self.pool.aclose()
+
+    async def _listen_for_invalidations(self):
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.cache.invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Session invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+    def _touch_due(self, session_id: str) -> bool:
+        last = self.touched.get(session_id)
+        return last is None or time.monotonic() - last >= self.touch_interval
+
+    def _mark_touched(self, session_id: str):
+        self.touched[session_id] = time.monotonic()
+        self.touched.move_to_end(session_id)
+        while len(self.touched) > self.cache.max_entries:
+            self.touched.popitem(last=False)
+
+    async def create_session(self, data: SessionData, ttl: Optional[int] = None) -> str:
         """Create a new session with the given data and TTL in seconds."""
         session_id = str(uuid.uuid4())
-        self.redis.setex(f"session:{session_id}", ttl, data.model_dump_json())
+        await self.redis.setex(f"session:{session_id}", ttl or self.ttl, data.model_dump_json())
+        self._mark_touched(session_id)
         return session_id
 
-    def get_session(self, session_id: str) -> Optional[SessionData]:
-        """Retrieve session data by session ID."""
-        data = self.redis.get(f"session:{session_id}")
+    async def get_session(self, session_id: str) -> Optional[SessionData]:
+        """Retrieve session data by session ID, sliding its expiry."""
+        cached = self.cache.get(session_id)
+        touch = self._touch_due(session_id)
+        if cached is not None and not touch:
+            return cached
+
+        start = time.perf_counter()
+        key = f"session:{session_id}"
+        data = await self.redis.getex(key, ex=self.ttl) if touch else await self.redis.get(key)
+        metrics.observe_stage("redis_session", time.perf_counter() - start, command="getex" if touch else "get")
         if data is None:
+            self.cache.invalidate(session_id)
+            self.touched.pop(session_id, None)
             return None
+        if touch:
+            self._mark_touched(session_id)
+        if cached is not None:
+            return cached
         data_str = cast(str, data)
-        return SessionData.model_validate(json.loads(data_str))
+        session = SessionData.model_validate(json.loads(data_str))
+        self.cache.record_lookup((time.perf_counter() - start) * 1000)
+        self.cache.put(session_id, session)
+        return session
 
-    def delete_session(self, session_id: str) -> bool:
+    async def delete_session(self, session_id: str) -> bool:
         """Delete a session by ID."""
-        return bool(self.redis.delete(f"session:{session_id}"))
+        self.cache.invalidate(session_id)
+        self.touched.pop(session_id, None)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(f"session:{session_id}")
+            pipe.publish(INVALIDATION_CHANNEL, session_id)
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
 
-    def extend_session(self, session_id: str, ttl: int) -> bool:
+    async def extend_session(self, session_id: str, ttl: int) -> bool:
         """Extend the TTL of a session."""
-        key = f"session:{session_id}"
-        if self.redis.exists(key):
-            self.redis.expire(key, ttl)
-            return True
-        return False
+        extended = bool(await self.redis.expire(f"session:{session_id}", ttl))
+        if extended:
+            self._mark_touched(session_id)
+        return extended
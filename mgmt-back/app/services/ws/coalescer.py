@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Optional
+from .connection_manager import ConnectionManager
+
+
+class OrderCoalescer:
+    """Collapses bursts of order events before they reach the WebSocket clients.
+
+    Events arriving within `window_ms` of the first one are held back; only
+    the latest state of each order survives and the survivors go out in one
+    broadcast_orders() call. With a window of 0 every event is broadcast
+    immediately, as before.
+    """
+
+    def __init__(self, manager: ConnectionManager, window_ms: float = 0):
+        self.manager = manager
+        self.window = window_ms / 1000
+        self.pending: dict[str, tuple[dict, Optional[str]]] = {}
+        self.flusher: Optional[asyncio.Task] = None
+        self.received = 0
+        self.broadcast = 0
+        self.flushes = 0
+
+    async def add(self, order: dict, encoded: Optional[str] = None):
+        """Queue an order event; `encoded` is its JSON if already at hand."""
+        self.received += 1
+        if self.window <= 0:
+            self.broadcast += 1
+            await self.manager.broadcast_order(order, encoded)
+            return
+        # Re-inserted so orders go out in the sequence of their latest change
+        key = order.get("_id") or str(id(order))
+        self.pending.pop(key, None)
+        self.pending[key] = (order, encoded)
+        if not self.flusher:
+            self.flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self.flusher = None
+        await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        orders = [order for order, _ in self.pending.values()]
+        encoded = [text for _, text in self.pending.values()]
+        self.pending.clear()
+        self.broadcast += len(orders)
+        self.flushes += 1
+        try:
+            await self.manager.broadcast_orders(orders, encoded)
+        except Exception as e:
+            logging.error(f"Error broadcasting {len(orders)} coalesced orders: {e}")
+
+    async def close(self):
+        if self.flusher:
+            self.flusher.cancel()
+            self.flusher = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "pending": len(self.pending),
+            "received": self.received,
+            "broadcast": self.broadcast,
+            "coalesced": self.received - self.broadcast - len(self.pending),
+            "flushes": self.flushes,
+        }
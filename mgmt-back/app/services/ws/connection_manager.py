@@ -1,17 +1,408 @@
-from typing import List
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Literal, Optional, get_args
 from fastapi import WebSocket
+from pydantic import BaseModel
+from app.database.models import OrderStatus, OrderType
+from app.lib.utils.metrics import metrics
+
+SlowClientPolicy = Literal["drop_oldest", "coalesce", "disconnect"]
+SLOW_CLIENT_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class Subscription(BaseModel):
+    """Which order events a client wants. Unset filters match everything."""
+    status: Optional[List[OrderStatus]] = None
+    type: Optional[List[OrderType]] = None
+    # Only orders created by the connected user
+    mine: bool = False
+
+    def topics(self) -> list[tuple[str, str]]:
+        statuses = self.status or get_args(OrderStatus)
+        types = self.type or get_args(OrderType)
+        return list(itertools.product(statuses, types))
+
+    def matches(self, order: dict, user: Optional[str]) -> bool:
+        return (
+            (not self.status or order.get("status") in self.status)
+            and (not self.type or order.get("type") in self.type)
+            and (not self.mine or order.get("id_user") == user)
+        )
+
+    def concerns(self, order: dict, user: Optional[str], statuses: Iterable[str]) -> bool:
+        """Like matches(), but for an order clients may still be showing under any of `statuses`."""
+        return (
+            (not self.status or any(status in self.status for status in statuses))
+            and (not self.type or order.get("type") in self.type)
+            and (not self.mine or order.get("id_user") == user)
+        )
+
+
+def _json_array(items: Iterable[str]) -> str:
+    return "[" + ", ".join(items) + "]"
+
+
+class ClientConnection:
+    """A connected socket with its own bounded outbound queue and writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int,
+        user: Optional[str],
+        subscription: Subscription,
+        sequenced: bool = False,
+        batch: bool = False,
+    ):
+        self.websocket = websocket
+        self.user = user
+        self.subscription = subscription
+        # Sequenced clients get {"seq", "epoch", "event", "data"} envelopes instead of bare orders
+        self.sequenced = sequenced
+        # Batch clients get all orders of a broadcast in one frame instead of one frame each
+        self.batch = batch
+        # Whether the client offered permessage-deflate; the server accepts it unless disabled in uvicorn
+        self.deflate = "permessage-deflate" in websocket.headers.get("sec-websocket-extensions", "")
+        self.max_queue = max_queue
+        self.queue: deque[tuple[Optional[str], str]] = deque()
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.sent = 0
+        # Uncompressed payload characters, the same as bytes for ASCII JSON
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.last_send_ms = 0.0
+        self.avg_send_ms = 0.0
+
+    @property
+    def name(self) -> str:
+        client = self.websocket.client
+        return f"{client.host}:{client.port}" if client else str(id(self.websocket))
+
+    def enqueue(self, message: str, key: Optional[str], policy: SlowClientPolicy) -> bool:
+        """Queue a message without waiting. Returns False if the client must be dropped."""
+        if policy == "coalesce" and key is not None:
+            # A newer state for the same key supersedes the one still waiting
+            for index, (queued_key, _) in enumerate(self.queue):
+                if queued_key == key:
+                    if self.sequenced:
+                        # Replacing in place would send this seq before the ones queued after it
+                        del self.queue[index]
+                        self.queue.append((key, message))
+                    else:
+                        self.queue[index] = (key, message)
+                    self.dropped += 1
+                    metrics.inc("ws_messages_dropped", reason="superseded")
+                    return True
+
+        if len(self.queue) >= self.max_queue:
+            # A sequenced client can't tell a dropped event from a filtered one,
+            # so it is closed instead and catches up when it reconnects
+            if policy == "disconnect" or self.sequenced:
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+            metrics.inc("ws_messages_dropped", reason="queue_full")
+
+        self.queue.append((key, message))
+        self.ready.set()
+        return True
+
+    async def write_loop(self):
+        while True:
+            await self.ready.wait()
+            while self.queue:
+                _, message = self.queue.popleft()
+                start = time.perf_counter()
+                await self.websocket.send_text(message)
+                self.bytes_sent += len(message)
+                self.last_send_ms = (time.perf_counter() - start) * 1000
+                metrics.observe_stage("ws_send", self.last_send_ms / 1000)
+                # Exponentially weighted so the figure tracks the current link quality
+                self.avg_send_ms = self.last_send_ms if not self.sent else 0.8 * self.avg_send_ms + 0.2 * self.last_send_ms
+                self.sent += 1
+            self.ready.clear()
+
+    def stats(self) -> dict:
+        return {
+            "client": self.name,
+            "user": self.user,
+            "subscription": self.subscription.model_dump(exclude_defaults=True),
+            "sequenced": self.sequenced,
+            "batch": self.batch,
+            "deflate": self.deflate,
+            "queue_depth": len(self.queue),
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "last_send_ms": round(self.last_send_ms, 3),
+            "avg_send_ms": round(self.avg_send_ms, 3),
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """Fans messages out to WebSocket clients.
+
+    Broadcasting only enqueues: each client is drained by its own writer task,
+    so a slow or dead socket never delays the others. When a client's queue
+    is full the `policy` decides what happens:
+
+    - drop_oldest: discard the oldest queued message
+    - coalesce: replace a queued message with the same key, else drop oldest
+    - disconnect: close the slow client
+
+    Sequenced clients are always closed rather than losing a queued event.
 
-    async def connect(self, websocket: WebSocket):
+    Order events go through broadcast_orders(), which looks up the clients
+    subscribed to each order's (status, type) topic in an index and
+    serializes every distinct frame once for all of its recipients. Clients
+    subscribed to the status the order was last broadcast with get it too,
+    so a screen learns when an order leaves it. Batch clients get the orders
+    of one call in a single frame.
+
+    Every order event gets a sequence number and is kept in a bounded replay
+    buffer. A sequenced client reconnecting with the last (epoch, seq) it saw
+    receives only what it missed, or a snapshot from `snapshot` if the gap
+    is no longer in the buffer or the process restarted (new epoch). The
+    sequence is global, not per subscription: a client sees increasing seqs
+    with gaps for events its filters skipped or coalescing superseded, never
+    for lost ones.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 100,
+        policy: SlowClientPolicy = "drop_oldest",
+        replay_size: int = 1000,
+        snapshot: Optional[Callable[[], list[dict]]] = None,
+        tracked_orders: int = 10000,
+    ):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {policy}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.topics: Dict[tuple[str, str], set[ClientConnection]] = {}
+        self.disconnected_slow = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        # (seq, order, text, statuses whose subscribers the event concerns)
+        self.history: deque[tuple[int, dict, str, tuple[str, ...]]] = deque(maxlen=replay_size)
+        # Status each recent order was last broadcast with, oldest first
+        self.last_status: OrderedDict[str, Optional[str]] = OrderedDict()
+        self.tracked_orders = tracked_orders
+        self.snapshot = snapshot
+        self.replays = 0
+        self.snapshots = 0
+        # Frames and bytes of clients that already left, plus the sample rates are measured from
+        self.retired = (0, 0)
+        self.rate_sample = (time.monotonic(), 0, 0)
+
+    def _envelope(self, seq: int, event: str, data: str) -> str:
+        """Wrap already encoded JSON `data` without decoding it again."""
+        return f'{{"seq": {seq}, "epoch": "{self.epoch}", "event": "{event}", "data": {data}}}'
+
+    def _catch_up(self, client: ClientConnection, resume: Optional[tuple[Optional[str], int]]) -> list[tuple[Optional[str], str]]:
+        """Messages bringing a sequenced client from `resume` to now: the missed deltas, else a snapshot."""
+        if resume is not None:
+            epoch, last_seq = resume
+            oldest = self.history[0][0] if self.history else self.seq + 1
+            missed = [event for event in self.history if event[0] > last_seq]
+            if epoch == self.epoch and oldest - 1 <= last_seq <= self.seq and len(missed) < self.max_queue:
+                self.replays += 1
+                missed = [event for event in missed if client.subscription.concerns(event[1], client.user, event[3])]
+                if client.batch:
+                    if not missed:
+                        return []
+                    return [(None, self._envelope(missed[-1][0], "orders", _json_array(text for _, _, text, _ in missed)))]
+                return [(order.get("_id"), self._envelope(seq, "order", text)) for seq, order, text, _ in missed]
+        self.snapshots += 1
+        orders = [
+            order for order in (self.snapshot() if self.snapshot else [])
+            if client.subscription.matches(order, client.user)
+        ]
+        return [(None, self._envelope(self.seq, "snapshot", json.dumps(orders)))]
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user: Optional[str] = None,
+        subscription: Optional[Subscription] = None,
+        sequenced: bool = False,
+        resume: Optional[tuple[Optional[str], int]] = None,
+        batch: bool = False,
+    ):
+        """Register a client.
+
+        A sequenced client first receives a snapshot, or, when `resume` gives
+        the (epoch, seq) it last saw, just the events it missed.
+        """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.max_queue, user, subscription or Subscription(), sequenced, batch)
+        # Catch-up is queued before the client is indexed, with no await in
+        # between, so no live event can overtake it
+        if sequenced:
+            client.queue.extend(self._catch_up(client, resume))
+            if client.queue:
+                client.ready.set()
+        client.writer = asyncio.create_task(self._run_writer(client))
+        self.active_connections[websocket] = client
+        self._index(client)
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        """Replace the filters of a connected client."""
+        client = self.active_connections.get(websocket)
+        if client:
+            self._unindex(client)
+            client.subscription = subscription
+            self._index(client)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            self._unindex(client)
+            self.retired = (self.retired[0] + client.sent, self.retired[1] + client.bytes_sent)
+        if client and client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def _index(self, client: ClientConnection):
+        for topic in client.subscription.topics():
+            self.topics.setdefault(topic, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        for topic in client.subscription.topics():
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.topics[topic]
+
+    async def _run_writer(self, client: ClientConnection):
+        try:
+            await client.write_loop()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.info(f"Dropping WebSocket client {client.name}: {e}")
+            self.disconnect(client.websocket)
+
+    async def _close_slow(self, client: ClientConnection):
+        self.disconnected_slow += 1
+        metrics.inc("ws_slow_disconnects")
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
+
+    def _send(self, clients, message: str, key: Optional[str]):
+        for client in clients:
+            if not client.enqueue(message, key, self.policy):
+                asyncio.create_task(self._close_slow(client))
+
+    async def broadcast_order(self, order: dict, encoded: Optional[str] = None):
+        """Queue an order event for the clients whose subscription matches it.
+
+        `encoded` is the order's JSON if the caller already has it.
+        """
+        await self.broadcast_orders([order], [encoded])
+
+    def _statuses(self, order: dict) -> tuple[str, ...]:
+        """The order's status plus the one subscribers last saw it with, and remember the new one."""
+        status = order.get("status")
+        order_id = order.get("_id")
+        previous = self.last_status.pop(order_id, None) if order_id is not None else None
+        if order_id is not None:
+            self.last_status[order_id] = status
+            if len(self.last_status) > self.tracked_orders:
+                self.last_status.popitem(last=False)
+        if previous is None and order.get("updated_at") is not None:
+            # Changed before this process saw it, so any screen may be showing it
+            return get_args(OrderStatus)
+        return (status,) if previous in (None, status) else (status, previous)
+
+    def _subscribers(self, order: dict, statuses: tuple[str, ...]) -> set[ClientConnection]:
+        if len(statuses) == 1:
+            return self.topics.get((statuses[0], order.get("type")), set())
+        subscribers: set[ClientConnection] = set()
+        for status in statuses:
+            subscribers.update(self.topics.get((status, order.get("type")), ()))
+        return subscribers
+
+    async def broadcast_orders(self, orders: list[dict], encoded: Optional[list[Optional[str]]] = None):
+        """Queue order events for the clients whose subscriptions match them, or matched them before."""
+        start = time.perf_counter()
+        events: list[tuple[int, dict, str, tuple[str, ...]]] = []
+        for order, text in zip(orders, encoded or [None] * len(orders)):
+            self.seq += 1
+            event = (self.seq, order, text if text is not None else json.dumps(order), self._statuses(order))
+            self.history.append(event)
+            events.append(event)
+
+        # Matching events per batch client, in order
+        batches: Dict[ClientConnection, list[int]] = {}
+        for index, (seq, order, text, statuses) in enumerate(events):
+            subscribers = self._subscribers(order, statuses)
+            if not subscribers:
+                continue
+            plain, sequenced = [], []
+            for client in subscribers:
+                if client.subscription.mine and client.user != order.get("id_user"):
+                    continue
+                if client.batch:
+                    batches.setdefault(client, []).append(index)
+                else:
+                    (sequenced if client.sequenced else plain).append(client)
+            if plain:
+                self._send(plain, text, order.get("_id"))
+            if sequenced:
+                self._send(sequenced, self._envelope(seq, "order", text), order.get("_id"))
+
+        # Clients with the same filters share a frame, so group before serializing
+        frames: Dict[tuple[tuple[int, ...], bool], list[ClientConnection]] = {}
+        for client, indexes in batches.items():
+            frames.setdefault((tuple(indexes), client.sequenced), []).append(client)
+        for (indexes, sequenced), clients in frames.items():
+            data = _json_array(events[index][2] for index in indexes)
+            if sequenced:
+                data = self._envelope(events[indexes[-1]][0], "orders", data)
+            self._send(clients, data, None)
+        metrics.observe_stage("ws_broadcast", time.perf_counter() - start)
+
+    def rates(self) -> dict:
+        """Frames and bytes per second sent to clients since the previous call."""
+        frames = self.retired[0] + sum(client.sent for client in self.active_connections.values())
+        sent_bytes = self.retired[1] + sum(client.bytes_sent for client in self.active_connections.values())
+        now = time.monotonic()
+        since, last_frames, last_bytes = self.rate_sample
+        self.rate_sample = (now, frames, sent_bytes)
+        elapsed = max(now - since, 1e-9)
+        return {
+            "frames_sent": frames,
+            "bytes_sent": sent_bytes,
+            "frames_per_sec": round((frames - last_frames) / elapsed, 1),
+            "bytes_per_sec": round((sent_bytes - last_bytes) / elapsed, 1),
+        }
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
\ No newline at end of file
+    def stats(self) -> dict:
+        clients = [client.stats() for client in self.active_connections.values()]
+        return {
+            "connections": len(clients),
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "dropped": sum(client["dropped"] for client in clients),
+            "disconnected_slow": self.disconnected_slow,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replay_buffered": len(self.history),
+            "tracked_orders": len(self.last_status),
+            "replays": self.replays,
+            "snapshots": self.snapshots,
+            **self.rates(),
+            "clients": clients,
+        }
@@ -0,0 +1 @@
+# Lets pytest import the app package from mgmt-back/
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database.mongo import AsyncDBClient
+from app.services.memory.memory import memory_mongo_client
+from benchutil import summarize
+
+# Runs concurrent GET /orders-sized reads against mongomock and measures how
+# long the event loop is held up meanwhile, which is what every other request,
+# WebSocket write and RabbitMQ consumer waits for:
+#
+#   inline:   DBClient called straight from the coroutine, as the handlers
+#             did before AsyncDBClient
+#   executor: the same call through AsyncDBClient's thread pool
+#
+# A probe task sleeps --probe-ms in a loop and records how late it wakes up.
+# mongomock holds the GIL while it works, unlike pymongo waiting on a socket,
+# so the executor numbers are pessimistic for a real server.
+#
+#   python scripts/bench_db_offload.py --orders 2000 --clients 8 --limit 200
+
+
+def sample_docs(count: int) -> list[dict]:
+    start = datetime(2026, 1, 1, 12)
+    return [
+        {
+            "id_user": "register@superrestaurant.com",
+            "items": [{"id_dish": f"{d:024x}", "quantity": 2, "selected_extras": None} for d in range(3)],
+            "total_cost": 30.0,
+            "status": "done",
+            "type": "dinein",
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i, minutes=10),
+        }
+        for i in range(count)
+    ]
+
+
+async def measure(db: AsyncDBClient, mode: str, args) -> dict:
+    async def fetch():
+        if mode == "inline":
+            return list(db.sync.get_orders(limit=args.limit))
+        return await db.get_orders(limit=args.limit)
+
+    lags: list[float] = []
+    stopping = asyncio.Event()
+
+    async def probe():
+        interval = args.probe_ms / 1000
+        while not stopping.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(max(time.perf_counter() - start - interval, 0.0) * 1000)
+
+    latencies: list[float] = []
+
+    async def client():
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            await fetch()
+            latencies.append((time.perf_counter() - start) * 1000)
+            # The server goes back to the loop between requests, whatever the handler did
+            await asyncio.sleep(0)
+
+    await fetch()  # warm up
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    stopping.set()
+    await prober
+    return {
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "request": summarize(latencies),
+        "loop_lag": summarize(lags),
+    }
+
+
+async def run(args) -> dict:
+    client = memory_mongo_client("bench", 0)
+    client["bench"]["orders"].insert_many(sample_docs(args.orders))
+    db = AsyncDBClient("", "bench", client=client, max_workers=args.workers)
+    result = {"orders": args.orders, "limit": args.limit, "clients": args.clients, "requests": args.clients * args.requests}
+    for mode in ("inline", "executor"):
+        result[mode] = await measure(db, mode, args)
+    db.executor.shutdown(wait=True)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event loop lag with blocking vs offloaded Mongo reads")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=200, help="Orders per read")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="Reads per client")
+    parser.add_argument("--workers", type=int, default=8, help="Executor threads")
+    parser.add_argument("--probe-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
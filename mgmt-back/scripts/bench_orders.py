@@ -0,0 +1,79 @@
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchutil import percentile
+
+# Fires concurrent GET /orders requests against a running mgmt-back instance
+# and reports latency percentiles. Run it once against the old build and once
+# against the new one with the same arguments to compare.
+#
+#   python scripts/bench_orders.py --url http://localhost:8001 --session-id <id>
+
+
+def login(url: str, email: str, password: str) -> str:
+    request = urllib.request.Request(
+        f"{url}/login",
+        data=json.dumps({"email": email, "password": password}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["session_id"]
+
+
+def timed_get(url: str, session_id: str) -> float:
+    request = urllib.request.Request(url, headers={"session-id": session_id})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(url: str, session_id: str, path: str, concurrency: int, total: int) -> dict:
+    target = f"{url}{path}"
+    # Warm up connections and caches before measuring
+    for _ in range(min(concurrency, 10)):
+        timed_get(target, session_id)
+
+    errors = 0
+    samples: list[float] = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(timed_get, target, session_id) for _ in range(total)]
+        for future in futures:
+            try:
+                samples.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(statistics.median(samples), 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95), 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99), 2) if samples else None,
+        "max_ms": round(max(samples), 2) if samples else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent GET /orders latency benchmark")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--path", default="/orders")
+    parser.add_argument("--session-id")
+    parser.add_argument("--email", default="kitchen@superrestaurant.com")
+    parser.add_argument("--password", default="1234")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    session_id = args.session_id or login(args.url, args.email, args.password)
+    print(json.dumps(run(args.url, session_id, args.path, args.concurrency, args.requests), indent=2))
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.pubsub.publisher import RabbitPublisher
+from app.services.pubsub.rabbit import RabbitPubSubService
+from benchutil import percentile
+
+# Publishes a burst of order events against a local RabbitMQ and reports
+# throughput plus confirm latency. Compare the inline path (--inline) with
+# the pooled publisher at different linger windows. Only run it against a
+# throwaway local broker: events go to orders:new, which is purged at the end.
+#
+#   python scripts/bench_pubsub.py --inline
+#   python scripts/bench_pubsub.py --channels 4 --linger-ms 0
+#   python scripts/bench_pubsub.py --channels 4 --linger-ms 5
+
+
+def sample_order(i: int) -> dict:
+    return {
+        "_id": f"{i:024x}",
+        "id_user": "register@superrestaurant.com",
+        "items": [{"id_dish": "0" * 24, "quantity": 2, "selected_extras": None}],
+        "total_cost": 12.5,
+        "status": "preparing",
+        "type": "dinein",
+        "created_at": "2026-01-01T12:00:00",
+        "updated_at": None,
+    }
+
+
+async def run(args) -> dict:
+    publisher = None if args.inline else RabbitPublisher(
+        pool_size=args.channels,
+        linger_ms=args.linger_ms,
+        max_batch=args.max_batch,
+        buffer_size=args.buffer,
+    )
+    pubsub = RabbitPubSubService(
+        host=os.getenv("RABBITMQ_HOST", "localhost"),
+        port=int(os.getenv("RABBITMQ_PORT", 5672)),
+        user=os.getenv("RABBITMQ_USER", "admin"),
+        password=os.getenv("RABBITMQ_PASSWORD", "admin"),
+        publisher=publisher,
+    )
+    await pubsub.connect()
+    queue_name = "orders:new"
+    assert pubsub.channel is not None
+
+    enqueue_ms: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def publish(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await pubsub.pub(queue_name, sample_order(i))
+            enqueue_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(publish(i) for i in range(args.events)))
+    if publisher:
+        await publisher.flush(timeout=60)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "mode": "inline" if args.inline else f"pool={args.channels} linger={args.linger_ms}ms",
+        "events": args.events,
+        "events_per_sec": round(args.events / elapsed, 1),
+        "pub_call_p50_ms": round(percentile(enqueue_ms, 50), 3),
+        "pub_call_p99_ms": round(percentile(enqueue_ms, 99), 3),
+    }
+    if publisher:
+        result["publisher"] = publisher.stats()
+    await pubsub.channel.queue_purge(queue_name)
+    await pubsub.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RabbitMQ publish throughput benchmark")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--inline", action="store_true", help="publish on the shared channel, no publisher pool")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--linger-ms", type=float, default=0)
+    parser.add_argument("--max-batch", type=int, default=50)
+    parser.add_argument("--buffer", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI, Response
+
+from app.database.models import Order
+from app.lib.utils.order import orders_json
+
+# Serializes the same batch of order documents, as they come out of
+# DBClient.get_orders, through two GET /orders handlers and reports
+# documents per second:
+#
+#   per-row: Order.model_validate per document, then FastAPI validates and
+#            serializes the list again through response_model=List[Order]
+#   adapter: one TypeAdapter(list[Order]) validation and dump_json, returned
+#            as pre-serialized bytes
+#
+# Requests go straight through the ASGI app, no network and no Mongo.
+#
+#   python scripts/bench_read_path.py --orders 10000
+
+
+def sample_docs(count: int) -> list[dict]:
+    start = datetime(2026, 1, 1, 12)
+    return [
+        {
+            "_id": f"{i:024x}",
+            "id_user": "register@superrestaurant.com",
+            "items": [
+                {"id_dish": f"{d:024x}", "quantity": 2, "selected_extras": [{"name": "cheese", "cost": 1.5}] if d else None}
+                for d in range(3)
+            ],
+            "total_cost": 31.5,
+            "status": "done",
+            "type": "dinein",
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i, minutes=10),
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(docs: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/per-row", response_model=List[Order])
+    async def per_row():
+        result = []
+        for order in docs:
+            order_dict = dict(order)
+            result.append(Order.model_validate(order_dict, by_alias=True))
+        return result
+
+    @app.get("/adapter", response_model=List[Order])
+    async def adapter():
+        return Response(content=orders_json(docs), media_type="application/json")
+
+    return app
+
+
+async def request(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("bench", 0), "server": ("bench", 80),
+    }
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+async def run(args) -> dict:
+    docs = sample_docs(args.orders)
+    app = build_app(docs)
+    result = {"orders": args.orders, "runs": args.runs}
+    bodies = {}
+    for path in ("/per-row", "/adapter"):
+        await request(app, path)  # warm up
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            bodies[path] = await request(app, path)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        result[path.strip("/")] = {
+            "best_ms": round(best * 1000, 1),
+            "docs_per_sec": round(args.orders / best),
+            "bytes": len(bodies[path]),
+        }
+    result["same_payload"] = json.loads(bodies["/per-row"]) == json.loads(bodies["/adapter"])
+    result["speedup"] = round(result["per-row"]["best_ms"] / result["adapter"]["best_ms"], 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /orders validation and serialization benchmark")
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.ws.coalescer import OrderCoalescer
+from app.services.ws.connection_manager import ConnectionManager
+
+# Replays a burst of order transitions through the WebSocket fan-out in
+# process and reports what the screens would receive: frames and bytes per
+# second, raw and after permessage-deflate (estimated with a per-client
+# zlib stream with context takeover, as browsers negotiate it). Needs no
+# running services.
+#
+#   python scripts/bench_ws.py --window-ms 0
+#   python scripts/bench_ws.py --window-ms 50
+#   python scripts/bench_ws.py --window-ms 50 --batch
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.client = None
+        self.headers = {"sec-websocket-extensions": "permessage-deflate"}
+        self.compressor = zlib.compressobj(wbits=-15)
+        self.frames = 0
+        self.raw_bytes = 0
+        self.deflated_bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        payload = message.encode()
+        # permessage-deflate strips the trailing 00 00 ff ff of the sync flush
+        compressed = self.compressor.compress(payload) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.frames += 1
+        self.raw_bytes += len(payload)
+        self.deflated_bytes += len(compressed) - 4
+
+
+def sample_order(i: int, status: str) -> dict:
+    return {
+        "_id": f"{i:024x}",
+        "id_user": "register@superrestaurant.com",
+        "items": [{"id_dish": f"{d:024x}", "quantity": 1, "selected_extras": None} for d in range(3)],
+        "total_cost": 27.5,
+        "status": status,
+        "type": "dinein",
+        "created_at": "2026-01-01T12:00:00",
+        "updated_at": "2026-01-01T12:05:00",
+    }
+
+
+async def run(args) -> dict:
+    manager = ConnectionManager(max_queue=10000)
+    coalescer = OrderCoalescer(manager, window_ms=args.window_ms)
+    sockets = [FakeWebSocket() for _ in range(args.clients)]
+    for websocket in sockets:
+        await manager.connect(websocket, batch=args.batch)  # type: ignore[arg-type]
+
+    # Each order moves through its statuses in quick succession, interleaved with others
+    events = [
+        (order, status)
+        for order in range(args.orders)
+        for status in ("preparing", "done", "delivered")[:args.transitions]
+    ]
+    random.seed(1)
+    events.sort(key=lambda event: event[0] + random.random() * args.spread)
+
+    start = time.perf_counter()
+    for order, status in events:
+        await coalescer.add(sample_order(order, status))
+        if args.interval_ms:
+            await asyncio.sleep(args.interval_ms / 1000)
+    await coalescer.close()
+    while any(client.queue for client in manager.active_connections.values()):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(websocket.frames for websocket in sockets)
+    raw_bytes = sum(websocket.raw_bytes for websocket in sockets)
+    deflated_bytes = sum(websocket.deflated_bytes for websocket in sockets)
+    for websocket in sockets:
+        manager.disconnect(websocket)  # type: ignore[arg-type]
+    return {
+        "window_ms": args.window_ms,
+        "batch": args.batch,
+        "events": len(events),
+        "clients": args.clients,
+        "seconds": round(elapsed, 3),
+        "coalescer": coalescer.stats(),
+        "frames": frames,
+        "frames_per_sec": round(frames / elapsed, 1),
+        "raw_bytes_per_sec": round(raw_bytes / elapsed, 1),
+        "deflated_bytes_per_sec": round(deflated_bytes / elapsed, 1),
+        "deflate_ratio": round(deflated_bytes / raw_bytes, 3) if raw_bytes else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket fan-out frame and byte rate benchmark")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--transitions", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument("--spread", type=float, default=5, help="how many orders' transitions interleave")
+    parser.add_argument("--interval-ms", type=float, default=1, help="delay between events")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--window-ms", type=float, default=0)
+    parser.add_argument("--batch", action="store_true", help="clients receive one array frame per broadcast")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import websockets
+
+from benchutil import summarize
+
+# Simulates N register terminals posting orders and M kitchen screens on
+# /ws/orders, then reports order throughput, POST /orders latency and the
+# end-to-end delay from a register sending an order to each screen showing
+# it. Every run is appended to a JSONL file and compared with the previous
+# run of the same label.
+#
+# --spawn starts mgmt-back with APP_BACKEND=memory (needs mongomock and
+# fakeredis), so no Mongo, Redis, RabbitMQ or LDAP is required. Without it
+# the script targets --url, e.g. the docker-compose stack.
+#
+#   python scripts/loadgen.py --spawn --registers 3 --kitchens 4 --duration 20
+#   python scripts/loadgen.py --url http://localhost:8001 --password 1234 --label compose
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def request(url: str, method: str, path: str, body=None, headers=None) -> tuple[int, bytes]:
+    req = urllib.request.Request(
+        f"{url}{path}",
+        data=json.dumps(body).encode("utf-8") if body is not None else None,
+        headers={"Content-Type": "application/json", **(headers or {})},
+        method=method,
+    )
+    with urllib.request.urlopen(req) as response:
+        return response.status, response.read()
+
+
+def login(url: str, email: str, password: str, source_ip: str) -> str:
+    # Distinct source addresses so the per-IP login limit doesn't kick in; the
+    # target must list this host in TRUSTED_PROXIES for them to count
+    _, body = request(url, "POST", "/login", {"email": email, "password": password}, {"X-Real-IP": source_ip})
+    return json.loads(body)["session_id"]
+
+
+def spawn_server() -> tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        # Trust X-Real-IP from the load generator, which spreads logins over fake addresses
+        env={**os.environ, "APP_BACKEND": "memory", "TRUSTED_PROXIES": "127.0.0.1"},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            # 503 (an HTTPError, so an OSError) until the in-memory backends are set up
+            request(url, "GET", "/readyz")
+            return server, url
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("mgmt-back exited during startup")
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("mgmt-back did not start within 30s")
+
+
+def register_loop(url: str, session_id: str, dish_ids: list[str], deadline: float, rate: float, sent: list) -> int:
+    """Post orders until the deadline. Appends (order_id, sent_at, latency_ms); returns the error count."""
+    parsed = urllib.parse.urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port)
+    headers = {"Content-Type": "application/json", "session-id": session_id}
+    errors = 0
+    next_at = time.perf_counter()
+    while time.perf_counter() < deadline:
+        items = [{"id_dish": dish_id, "quantity": random.randint(1, 3)} for dish_id in random.sample(dish_ids, k=random.randint(1, 3))]
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/orders", json.dumps(items), headers)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                raise RuntimeError(f"POST /orders returned {response.status}")
+            sent.append((json.loads(body)["_id"], start, (time.perf_counter() - start) * 1000))
+        except Exception:
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port)
+        if rate:
+            next_at += 1 / rate
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+    conn.close()
+    return errors
+
+
+async def kitchen_screen(ws_url: str, session_id: str, arrivals: dict[str, float], connected: asyncio.Event):
+    async with websockets.connect(f"{ws_url}/ws/orders?session-id={session_id}&status=preparing") as websocket:
+        connected.set()
+        async for message in websocket:
+            order = json.loads(message)
+            arrivals.setdefault(order["_id"], time.perf_counter())
+
+
+async def run(args, url: str) -> dict:
+    registers = [
+        login(url, f"register{i}@bench.local", args.password, f"10.1.{i // 250}.{i % 250 + 1}")
+        for i in range(args.registers)
+    ]
+    kitchens = [
+        login(url, f"kitchen{i}@bench.local", args.password, f"10.2.{i // 250}.{i % 250 + 1}")
+        for i in range(args.kitchens)
+    ]
+    _, body = request(url, "GET", "/dishes", headers={"session-id": registers[0]})
+    dish_ids = [dish["_id"] for dish in json.loads(body)]
+
+    ws_url = url.replace("http", "ws", 1)
+    arrivals: list[dict[str, float]] = [{} for _ in kitchens]
+    screens = []
+    for session_id, seen in zip(kitchens, arrivals):
+        connected = asyncio.Event()
+        screens.append(asyncio.create_task(kitchen_screen(ws_url, session_id, seen, connected)))
+        await asyncio.wait_for(connected.wait(), 10)
+
+    loop = asyncio.get_running_loop()
+    sent: list[tuple[str, float, float]] = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=len(registers)) as pool:
+        errors = sum(await asyncio.gather(*(
+            loop.run_in_executor(pool, register_loop, url, session_id, dish_ids, deadline, args.rate, sent)
+            for session_id in registers
+        )))
+    elapsed = time.perf_counter() - start
+
+    # Give the screens time to receive the last orders
+    drain_deadline = time.perf_counter() + args.drain
+    while time.perf_counter() < drain_deadline and any(len(seen) < len(sent) for seen in arrivals):
+        await asyncio.sleep(0.05)
+    for screen in screens:
+        screen.cancel()
+    await asyncio.gather(*screens, return_exceptions=True)
+
+    delays = []
+    missing = 0
+    for order_id, sent_at, _ in sent:
+        for seen in arrivals:
+            if order_id in seen:
+                delays.append((seen[order_id] - sent_at) * 1000)
+            else:
+                missing += 1
+    return {
+        "orders": len(sent),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "throughput_ops": round(len(sent) / elapsed, 1),
+        "post_orders": summarize([latency for _, _, latency in sent]),
+        "order_to_screen": {**summarize(delays), "deliveries": len(delays), "missing": missing},
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def store(path: str, record: dict) -> dict | None:
+    """Append the run to `path` and return the previous run with the same label."""
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get("label") == record["label"]:
+                    previous = entry
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return previous
+
+
+def compare(previous: dict, current: dict) -> dict:
+    def change(before, after):
+        if before is None or after is None:
+            return None
+        return f"{before} -> {after} ({(after - before) / before * 100:+.1f}%)" if before else f"{before} -> {after}"
+
+    was, now = previous["result"], current["result"]
+    return {
+        "against": f"{previous['timestamp']} ({previous.get('commit')})",
+        "throughput_ops": change(was["throughput_ops"], now["throughput_ops"]),
+        "post_orders_p50_ms": change(was["post_orders"]["p50_ms"], now["post_orders"]["p50_ms"]),
+        "post_orders_p99_ms": change(was["post_orders"]["p99_ms"], now["post_orders"]["p99_ms"]),
+        "order_to_screen_p50_ms": change(was["order_to_screen"]["p50_ms"], now["order_to_screen"]["p50_ms"]),
+        "order_to_screen_p99_ms": change(was["order_to_screen"]["p99_ms"], now["order_to_screen"]["p99_ms"]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Register and kitchen screen load generator")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--spawn", action="store_true", help="start mgmt-back with in-memory backends")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--registers", type=int, default=3)
+    parser.add_argument("--kitchens", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--rate", type=float, default=0, help="orders/sec per register, 0 = as fast as possible")
+    parser.add_argument("--drain", type=float, default=5, help="seconds to wait for screens after the last order")
+    parser.add_argument("--label", help="runs are compared with the previous run of the same label")
+    parser.add_argument("--results", default=os.path.join(ROOT, "bench-results", "loadgen.jsonl"))
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.spawn:
+        server, url = spawn_server()
+    try:
+        result = asyncio.run(run(args, url))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    config = {key: getattr(args, key) for key in ("registers", "kitchens", "duration", "rate")}
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label or ("memory" if args.spawn else url),
+        "target": "memory" if args.spawn else url,
+        "config": config,
+        "result": result,
+    }
+    previous = store(args.results, record)
+    print(json.dumps(record, indent=2))
+    if previous:
+        print(json.dumps({"compared": compare(previous, record)}, indent=2))
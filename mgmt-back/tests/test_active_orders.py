@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.orders.active import ActiveOrdersView
+
+
+def order(order_id: str, created_at, status: str = "preparing", updated_at=None) -> dict:
+    return {
+        "_id": order_id,
+        "id_user": "register@superrestaurant.com",
+        "items": [],
+        "total_cost": 10.0,
+        "status": status,
+        "type": "delivery",
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def test_mixes_naive_and_aware_orders():
+    view = ActiveOrdersView(db_client=None)  # type: ignore[arg-type]
+    view.ready = True
+    naive = datetime(2026, 1, 1, 12, 0)
+    # As published by the deliveries backend: a JS Date serialized with "Z"
+    view.apply(order("a", naive))
+    view.apply(order("b", "2026-01-01T11:30:00.000Z"))
+    view.apply(order("c", "2026-01-01T14:15:00+02:00"))
+
+    assert [o.id for o in view.query("preparing")] == ["b", "a", "c"]
+    assert all(o.created_at.tzinfo is None for o in view.query("preparing"))
+
+    # A naive update of an order first seen timezone-aware compares fine
+    view.apply(order("b", naive - timedelta(minutes=30), status="done", updated_at=naive + timedelta(minutes=5)))
+    assert [o.id for o in view.query("done")] == ["b"]
+
+    # And an older aware event doesn't roll it back
+    stale = datetime(2026, 1, 1, 12, 1, tzinfo=timezone.utc)
+    view.apply(order("b", "2026-01-01T11:30:00Z", status="preparing", updated_at=stale))
+    assert [o.id for o in view.query("done")] == ["b"]
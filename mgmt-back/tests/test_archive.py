@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from app.database.mongo import DBClient
+from app.services.memory.memory import memory_mongo_client
+
+
+def make_client() -> DBClient:
+    db = DBClient("", "orders_test", client=memory_mongo_client("orders_test", 0), archive_after=timedelta(hours=24))
+    db.ensure_indexes()
+    return db
+
+
+def insert_order(db: DBClient, created_at: datetime, status: str = "delivered"):
+    db.get_collection("orders").insert_one({
+        "id_user": "register@superrestaurant.com",
+        "items": [],
+        "total_cost": 10.0,
+        "status": status,
+        "type": "dinein",
+        "created_at": created_at,
+        "updated_at": created_at + timedelta(minutes=10),
+    })
+
+
+def test_offset_from_date_routes_between_tiers():
+    db = make_client()
+    now = datetime.now()
+    insert_order(db, now - timedelta(days=3))
+    insert_order(db, now - timedelta(hours=1))
+    assert db.archive_orders(100) == 1
+
+    # As sent by the register terminals: toISOString() and explicit offsets
+    old = (now - timedelta(days=5)).replace(tzinfo=timezone.utc)
+    recent = (now - timedelta(hours=2)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    assert db._reads_archive(None, old)
+    assert not db._reads_archive(None, recent)
+    assert len(list(db.get_orders(from_date=old))) == 2
+    assert len(list(db.get_orders(from_date=recent))) == 1
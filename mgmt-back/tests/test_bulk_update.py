@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import bson
+import pytest
+
+from app.database.mongo import OUTBOX_FIELD, DBClient, DuplicateOrderUpdateError
+from app.services.memory.memory import memory_mongo_client
+
+
+def make_client() -> DBClient:
+    db = DBClient("", "orders_test", client=memory_mongo_client("orders_test", 0))
+    db.ensure_indexes()
+    return db
+
+
+def insert_order(db: DBClient, status: str = "preparing") -> str:
+    result = db.get_collection("orders").insert_one({
+        "id_user": "register@superrestaurant.com",
+        "items": [],
+        "total_cost": 10.0,
+        "status": status,
+        "type": "dinein",
+        "created_at": datetime.now(),
+        "updated_at": None,
+    })
+    return str(result.inserted_id)
+
+
+def test_bulk_update_reports_each_update():
+    db = make_client()
+    preparing, done = insert_order(db), insert_order(db, "done")
+    missing = str(bson.ObjectId())
+
+    results = db.bulk_update_order_status([
+        (preparing, "done", "preparing"),
+        (done, "delivered", "preparing"),
+        (missing, "done", None),
+        ("not-an-id", "done", None),
+    ])
+
+    assert [(order_id, outcome) for order_id, outcome, _ in results] == [
+        (preparing, "updated"),
+        (done, "conflict"),
+        (missing, "not_found"),
+        ("not-an-id", "not_found"),
+    ]
+    assert results[0][2] is not None and results[0][2].status == "done"
+    assert results[1][2] is None
+    # Only the applied update left an event for the relay
+    outboxes = {str(doc["_id"]): doc.get(OUTBOX_FIELD, []) for doc in db.get_collection("orders").find()}
+    assert len(outboxes[preparing]) == 1 and outboxes[done] == []
+
+
+def test_bulk_update_rejects_repeated_orders():
+    db = make_client()
+    order_id = insert_order(db)
+
+    with pytest.raises(DuplicateOrderUpdateError) as error:
+        db.bulk_update_order_status([(order_id, "done", "preparing"), (order_id, "delivered", "done")])
+
+    assert error.value.order_ids == [order_id]
+    assert db.get_collection("orders").find_one()["status"] == "preparing"
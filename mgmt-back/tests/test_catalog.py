@@ -0,0 +1,37 @@
+import asyncio
+
+from app.services.catalog.catalog import DishCatalog
+
+
+class FakeDBClient:
+    def __init__(self, dishes: int):
+        self.dishes = [{"_id": f"{i:024x}", "title": f"Dish {i}", "cost_unit": float(i)} for i in range(dishes)]
+        self.full_loads = 0
+        self.cost_lookups = 0
+
+    async def get_dishes(self) -> list[dict]:
+        self.full_loads += 1
+        return [dict(dish) for dish in self.dishes]
+
+    async def get_dish_costs(self, dish_ids) -> dict[str, float]:
+        self.cost_lookups += 1
+        return {dish["_id"]: dish["cost_unit"] for dish in self.dishes if dish["_id"] in set(dish_ids)}
+
+
+def test_oversized_catalog_prices_orders_without_loading_it():
+    db_client = FakeDBClient(dishes=10)
+    catalog = DishCatalog(db_client, max_entries=5)  # type: ignore[arg-type]
+
+    async def run():
+        assert len(await catalog.get_dish_costs([f"{1:024x}"])) == 1
+        for _ in range(5):
+            assert await catalog.get_dish_costs([f"{2:024x}", f"{3:024x}"]) == {f"{2:024x}": 2.0, f"{3:024x}": 3.0}
+
+    asyncio.run(run())
+    # Only the first call loaded the catalog, to find out it is too large
+    assert db_client.full_loads == 1
+    assert db_client.cost_lookups == 5
+    assert catalog.stats()["cacheable"] is False
+
+    catalog.invalidate()
+    assert catalog.stats()["cacheable"] is True
@@ -0,0 +1,21 @@
+import os
+
+os.environ.setdefault("APP_BACKEND", "memory")
+os.environ.setdefault("TRUSTED_PROXIES", "172.25.0.2,10.0.0.0/8")
+
+from starlette.requests import Request
+
+from app.main import client_ip
+
+
+def request(peer: str, real_ip: str | None = None) -> Request:
+    headers = [(b"x-real-ip", real_ip.encode())] if real_ip else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 40000)})
+
+
+def test_x_real_ip_only_from_trusted_proxies():
+    assert client_ip(request("172.25.0.2", "172.25.0.10")) == "172.25.0.10"
+    assert client_ip(request("10.1.2.3", "172.25.0.11")) == "172.25.0.11"
+    # A terminal talking to the service directly can't pick its own address
+    assert client_ip(request("172.25.0.10", "1.2.3.4")) == "172.25.0.10"
+    assert client_ip(request("172.25.0.2")) == "172.25.0.2"
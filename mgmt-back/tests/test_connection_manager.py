@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from app.services.ws.connection_manager import ConnectionManager, Subscription
+
+
+class FakeWebSocket:
+    """Records sent frames; sends block while `gate` is cleared, like a slow link."""
+
+    def __init__(self):
+        self.headers: dict[str, str] = {}
+        self.client = None
+        self.frames: list[dict] = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        self.frames.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+
+def order(order_id: str, status: str = "preparing", updated_at=None) -> dict:
+    return {
+        "_id": order_id,
+        "id_user": "register@superrestaurant.com",
+        "status": status,
+        "type": "delivery",
+        "updated_at": updated_at,
+    }
+
+
+async def drain(websocket: FakeWebSocket):
+    websocket.gate.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_coalesce_keeps_sequenced_frames_in_order():
+    async def run():
+        manager = ConnectionManager(policy="coalesce", snapshot=lambda: [])
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        await manager.connect(websocket, sequenced=True)
+        await asyncio.sleep(0)  # the writer is now stuck sending the snapshot
+
+        await manager.broadcast_order(order("a"))
+        await manager.broadcast_order(order("b"))
+        await manager.broadcast_order(order("a", "done"))
+        await drain(websocket)
+
+        seqs = [frame["seq"] for frame in websocket.frames if frame["event"] == "order"]
+        assert seqs == [2, 3]
+        assert [frame["data"]["_id"] for frame in websocket.frames[1:]] == ["b", "a"]
+        assert websocket.frames[-1]["data"]["status"] == "done"
+
+    asyncio.run(run())
+
+
+def test_sequenced_clients_catch_up_after_reconnecting():
+    async def run():
+        manager = ConnectionManager(max_queue=3, policy="drop_oldest", replay_size=10, snapshot=lambda: [order("s")])
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, sequenced=True)
+        await manager.broadcast_order(order("o1"))
+        await drain(websocket)
+        assert [(frame["event"], frame["seq"]) for frame in websocket.frames] == [("snapshot", 0), ("order", 1)]
+        epoch = websocket.frames[0]["epoch"]
+        manager.disconnect(websocket)
+
+        # Reconnecting with the last (epoch, seq) replays exactly what was missed
+        await manager.broadcast_order(order("o2"))
+        await manager.broadcast_order(order("o3"))
+        resumed = FakeWebSocket()
+        await manager.connect(resumed, sequenced=True, resume=(epoch, 1))
+        await drain(resumed)
+        assert [(frame["event"], frame["seq"]) for frame in resumed.frames] == [("order", 2), ("order", 3)]
+        assert manager.replays == 1
+
+        # Overflowing the queue closes the client instead of dropping an event
+        resumed.gate.clear()
+        for index in range(4, 9):
+            await manager.broadcast_order(order(f"o{index}"))
+        await asyncio.sleep(0)
+        assert resumed.closed_with == 1013
+        assert resumed not in manager.active_connections
+
+        # Too much was missed to replay within a queue, so it gets a snapshot
+        late = FakeWebSocket()
+        await manager.connect(late, sequenced=True, resume=(epoch, 3))
+        await drain(late)
+        assert [(frame["event"], frame["seq"]) for frame in late.frames] == [("snapshot", 8)]
+
+        # As does a client of a previous process
+        restarted = FakeWebSocket()
+        await manager.connect(restarted, sequenced=True, resume=("stale", 8))
+        await drain(restarted)
+        assert [frame["event"] for frame in restarted.frames] == ["snapshot"]
+        assert manager.snapshots == 3
+
+    asyncio.run(run())
+
+
+def test_subscribers_of_the_previous_status_hear_an_order_leave():
+    async def run():
+        manager = ConnectionManager()
+        kitchen, dinein, delivered = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(kitchen, subscription=Subscription(status=["preparing"]))
+        await manager.connect(dinein, subscription=Subscription(status=["preparing"], type=["dinein"]))
+        await manager.connect(delivered, subscription=Subscription(status=["delivered"]))
+
+        await manager.broadcast_order(order("a"))
+        await manager.broadcast_order(order("a", "done", "2026-01-01T12:00:00"))
+        await manager.broadcast_order(order("a", "delivered", "2026-01-01T12:05:00"))
+        for websocket in (kitchen, dinein, delivered):
+            await drain(websocket)
+
+        # The kitchen saw it arrive and move on to done, but not what happened after
+        assert [frame["status"] for frame in kitchen.frames] == ["preparing", "done"]
+        assert dinein.frames == []
+        assert [frame["status"] for frame in delivered.frames] == ["delivered"]
+
+        # An update to an order this process never broadcast may leave any screen
+        await manager.broadcast_order(order("b", "done", "2026-01-01T12:10:00"))
+        await drain(kitchen)
+        assert [frame["_id"] for frame in kitchen.frames] == ["a", "a", "b"]
+
+        # Replay applies the same rule
+        resumed = FakeWebSocket()
+        await manager.connect(resumed, subscription=Subscription(status=["preparing"]), sequenced=True, resume=(manager.epoch, 1))
+        await drain(resumed)
+        assert [frame["seq"] for frame in resumed.frames] == [2, 4]
+
+    asyncio.run(run())
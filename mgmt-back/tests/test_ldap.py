@@ -0,0 +1,62 @@
+import pytest
+from ldap3.core.exceptions import LDAPBindError, LDAPSocketOpenError
+
+from app.database.ldap import LDAPConnectionPool, LDAPDatabase, LDAPPoolTimeout, LDAPUnavailableError
+
+
+class FakeConnection:
+    def __init__(self, passwords: dict[str, str], dead: bool = False):
+        self.passwords = passwords
+        self.dead = dead
+        self.result: dict = {}
+        self.last_error = ""
+        self.unbound = False
+
+    def rebind(self, user, password, read_server_info=True):
+        if self.dead:
+            raise LDAPBindError("the server abruptly closed the connection")
+        if self.passwords.get(user) == password:
+            self.result = {"result": 0, "description": "success"}
+            return True
+        self.result = {"result": 49, "description": "invalidCredentials"}
+        self.last_error = "invalidCredentials"
+        return False
+
+    def unbind(self):
+        self.unbound = True
+
+
+def database(factory) -> LDAPDatabase:
+    ldap_db = LDAPDatabase(pool_size=1, pool_timeout=0.01)
+    ldap_db.bind_pool = LDAPConnectionPool(factory, size=1, timeout=0.01)
+    return ldap_db
+
+
+def test_dead_connections_are_replaced_and_outages_raised():
+    passwords = {"uid=cook": "secret"}
+    ldap_db = database(lambda: FakeConnection(passwords))
+    dead = FakeConnection(passwords, dead=True)
+    ldap_db.bind_pool.idle.put(dead)
+
+    # The dead pooled connection is dropped and the bind retried on a new one
+    assert ldap_db.verify_password("uid=cook", "secret") is True
+    assert dead.unbound
+    assert ldap_db.bind_pool.idle.qsize() == 1 and not ldap_db.bind_pool.idle.queue[0].dead
+
+    # A wrong password is an answer, not a failure: the connection stays pooled
+    assert ldap_db.verify_password("uid=cook", "wrong") is False
+    assert ldap_db.bind_pool.idle.qsize() == 1
+
+    def unreachable():
+        raise LDAPSocketOpenError("connection refused")
+
+    ldap_db = database(unreachable)
+    with pytest.raises(LDAPUnavailableError):
+        ldap_db.verify_password("uid=cook", "secret")
+
+    # So is waiting out the pool
+    ldap_db = database(lambda: FakeConnection(passwords))
+    ldap_db.bind_pool.slots.acquire()
+    with pytest.raises(LDAPPoolTimeout):
+        ldap_db.verify_password("uid=cook", "secret")
+    assert issubclass(LDAPPoolTimeout, LDAPUnavailableError)
@@ -0,0 +1,27 @@
+from app.lib.utils.metrics import Metrics
+
+
+def test_counter_headers_name_their_samples():
+    metrics = Metrics()
+    metrics.describe("ws_messages_dropped", "counter", "WebSocket messages dropped")
+    metrics.inc("ws_messages_dropped", reason="queue_full")
+    metrics.add_collector(lambda: [
+        ("outbox_published", "counter", "Outbox events published", {}, 3),
+        ("ws_connections", "gauge", "Connected WebSocket clients", {}, 2),
+    ])
+
+    families: dict[str, str] = {}
+    samples: list[str] = []
+    for line in metrics.render().splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            families[name] = kind
+        elif not line.startswith("#"):
+            samples.append(line.split("{")[0].split(" ")[0])
+
+    assert families == {
+        "mgmt_ws_messages_dropped_total": "counter",
+        "mgmt_outbox_published_total": "counter",
+        "mgmt_ws_connections": "gauge",
+    }
+    assert set(samples) == set(families)
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.database.models import Order
+from app.database.mongo import OUTBOX_FIELD, AsyncDBClient
+from app.services.memory.memory import memory_mongo_client
+from app.services.outbox.outbox import OutboxRelay
+
+
+class FakePubSub:
+    """Collects confirmed publishes; fails the next `failures` of them."""
+
+    def __init__(self):
+        self.published: list[tuple[str, dict | list[dict]]] = []
+        self.failures = 0
+
+    async def pub(self, channel, message, confirm=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker went away")
+        self.published.append((channel, message))
+
+
+def new_order() -> Order:
+    return Order(id_user="register@superrestaurant.com", items=[], total_cost=10.0, status="preparing", type="dinein")
+
+
+def pending(db: AsyncDBClient) -> dict[str, list[dict]]:
+    return {str(doc["_id"]): doc[OUTBOX_FIELD] for doc in db.sync.get_collection("orders").find({OUTBOX_FIELD: {"$exists": True}})}
+
+
+def test_events_stay_until_confirmed_and_are_published_again():
+    async def run():
+        client = memory_mongo_client("orders_test", 0)
+        db = AsyncDBClient("", "orders_test", client=client)
+        pubsub = FakePubSub()
+        relay = OutboxRelay(db, pubsub)  # type: ignore[arg-type]
+
+        order_id = await db.create_order(new_order())
+        assert len(pending(db)[order_id]) == 1
+
+        # The broker didn't confirm: nothing is acknowledged
+        pubsub.failures = 1
+        try:
+            await relay.relay_batch()
+        except ConnectionError:
+            pass
+        assert len(pending(db)[order_id]) == 1
+
+        # The next round publishes it and only then removes the event
+        assert await relay.relay_batch() == 1
+        assert [(channel, message["_id"]) for channel, message in pubsub.published] == [("orders:new", order_id)]
+        assert pending(db) == {}
+        assert await relay.relay_batch() == 0
+
+        # An update writes a new event; an ack that doesn't happen means it goes out again
+        await db.bulk_update_order_status([(order_id, "done", "preparing")])
+        ack = db.ack_outbox
+
+        async def crash_before_ack(delivered):
+            raise ConnectionError("mongo went away")
+
+        db.ack_outbox = crash_before_ack  # type: ignore[method-assign]
+        try:
+            await relay.relay_batch()
+        except ConnectionError:
+            pass
+        db.ack_outbox = ack  # type: ignore[method-assign]
+        assert await relay.relay_batch() == 1
+        assert [channel for channel, _ in pubsub.published[1:]] == ["orders:updated", "orders:updated"]
+        assert all(message["status"] == "done" for _, message in pubsub.published[1:])
+        assert pending(db) == {}
+
+    asyncio.run(run())
+
+
+def test_overdue_events_of_another_instance_are_swept():
+    async def run():
+        client = memory_mongo_client("orders_test", 0)
+        db, stopped = AsyncDBClient("", "orders_test", client=client), AsyncDBClient("", "orders_test", client=client)
+        pubsub = FakePubSub()
+        relay = OutboxRelay(db, pubsub, overdue_after=30)  # type: ignore[arg-type]
+
+        order_id = await stopped.create_order(new_order())
+        # Not this instance's event, and not overdue yet
+        assert await relay.relay_batch() == 0
+        assert await relay.relay_batch(relay.overdue_after) == 0
+
+        stopped.sync.get_collection("orders").update_one(
+            {OUTBOX_FIELD: {"$exists": True}},
+            {"$set": {f"{OUTBOX_FIELD}.0.at": datetime.now() - timedelta(minutes=1)}},
+        )
+        assert await relay.relay_batch(relay.overdue_after) == 1
+        assert [message["_id"] for _, message in pubsub.published] == [order_id]
+        assert pending(db) == {}
+
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.services.pubsub.publisher import RabbitPublisher
+from app.services.pubsub.rabbit import Codec
+
+
+class FailingCodec(Codec):
+    def encode(self, message):
+        if isinstance(message, dict) and message.get("poison"):
+            raise ValueError("cannot encode")
+        return super().encode(message)
+
+
+class FakeExchange:
+    def __init__(self):
+        self.bodies: list[bytes] = []
+
+    async def publish(self, message, routing_key):
+        self.bodies.append(message.body)
+
+
+class FakeConnection:
+    async def channel(self, publisher_confirms=True):
+        return object()
+
+
+def test_failed_batch_fails_its_confirms_and_keeps_the_worker():
+    exchange = FakeExchange()
+
+    async def resolve_target(channel, queue_name):
+        if queue_name == "broken":
+            raise RuntimeError("no such exchange")
+        return exchange, queue_name
+
+    async def run():
+        publisher = RabbitPublisher(pool_size=1)
+        await publisher.start(FakeConnection(), resolve_target, FailingCodec())  # type: ignore[arg-type]
+
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(publisher.pub("orders:new", {"poison": True}, confirm=True), 1)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(publisher.pub("broken", {"id": 1}, confirm=True), 1)
+
+        # The single worker survived both and still publishes
+        await asyncio.wait_for(publisher.pub("orders:new", {"id": 2}, confirm=True), 1)
+        assert len(exchange.bodies) == 1
+        # Every taken entry was marked done, so flushing doesn't wait out its timeout
+        await asyncio.wait_for(publisher.buffer.join(), 1)
+        assert publisher.failures == 2
+        await publisher.close()
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.services.pubsub.rabbit import RabbitPubSubService
+
+
+class FakeQueue:
+    def __init__(self):
+        self.consumers = 0
+
+    async def consume(self, callback):
+        self.consumers += 1
+        return f"ctag-{self.consumers}"
+
+
+class FakeChannel:
+    def __init__(self):
+        self.queues: dict[str, FakeQueue] = {}
+
+    async def declare_queue(self, name, durable=False):
+        return self.queues.setdefault(name, FakeQueue())
+
+
+def test_subscribing_again_does_not_add_a_consumer():
+    async def run():
+        pubsub = RabbitPubSubService("localhost", 5672, "guest", "guest")
+        pubsub.channel = FakeChannel()  # type: ignore[assignment]
+
+        async def callback(message):
+            pass
+
+        await pubsub.sub("orders:new", callback)
+        # As a retried startup step would
+        await pubsub.sub("orders:new", callback)
+        assert pubsub.channel.queues["orders:new"].consumers == 1  # type: ignore[attr-defined]
+        assert pubsub.consumers == {"orders:new": "ctag-1"}
+
+    asyncio.run(run())
+
+
+def test_publishing_waits_for_a_connection_only_so_long():
+    async def run():
+        pubsub = RabbitPubSubService("localhost", 5672, "guest", "guest", connect_timeout=0.05)
+
+        async def never_connects(retries, interval):
+            await asyncio.Event().wait()
+
+        pubsub._connect = never_connects  # type: ignore[method-assign]
+        with pytest.raises(TimeoutError):
+            await pubsub.pub("dishes:invalidated", {})
+        # The lock was released, so a later attempt isn't stuck behind it
+        assert not pubsub.connect_lock.locked()
+
+    asyncio.run(run())